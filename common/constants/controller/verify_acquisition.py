@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+PASS="pass"
+FAIL="fail"
+MISSING="missing"
+
+JSON_FILENAME="acquisition_verification.json"
+PDF_FILENAME="acquisition_verification.pdf"
+NO_ENTRIES="acquisition.hash has no file entries"
+
+REPORT_TITLE="Verifica dell'integrità dell'acquisizione"
+REPORT_DESCRIPTION="Tutti i file elencati nel file acquisition.hash sono stati nuovamente letti e i relativi hash "\
+                   "sono stati confrontati con quelli calcolati al termine dell'acquisizione."
+REPORT_FILES="Esito della verifica dei file"
+REPORT_LABEL_FOLDER="Cartella dell'acquisizione"
+REPORT_LABEL_DATE="Data verifica"
+REPORT_LABEL_RESULT="Esito"
+REPORT_LABEL_ERROR="Motivo"
+REPORT_LABEL_NAME="Nome del file"
+REPORT_LABEL_SIZE="Dimensione (bytes)"
+REPORT_RESULT={PASS: "Verificato", FAIL: "Alterato", MISSING: "Non trovato"}
+REPORT_ALTERED_REGIONS="byte alterati: {}"
@@ -11,6 +11,8 @@ NETWORK_PACKET_CAPTURE_STARTED="Capture loop has been started in a new thread!"
 NETWORK_PACKET_CAPTURE_COMPLETED="Loop has been stopped and .pcap file has been saved in the case folder"
 SCREEN_RECORDER_STARTED="Recoder loop has been started in a new thread!"
 SCREEN_RECORDER_COMPLETED="Loop has been stopped and .avi file has been saved in the case folder"
+SCREEN_RECORDER_TELEMETRY="{fps:.1f} fps, {dropped} dropped frames, encoder queue {queue}, {disk} on disk, {memory} frame buffers"
+NETWORK_PACKET_CAPTURE_TELEMETRY="{rate:.0f} packets/s, {packets} packets, {disk} on disk, {memory} capture buffer"
 SSLCERTIFICATE_NOT_EXIST="Certificate don't exist on URL: {}"
 ACQUISITION_FINISHED="The acquisition has finished successfully. Do you want to open the case directory?"
 RETRY="Server configuration is correct, check search criteria"
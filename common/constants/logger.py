@@ -18,6 +18,16 @@ NETWORK_PACKET_CAPTURE_COMPLETED="Network packet capture completed"
 SCREEN_RECODER_PACKET_CAPTURE_STARTED="Screen recoder capture started"
 SCREEN_RECODER_PACKET_CAPTURE_STOPPED="Screen recoder capture stopped"
 SCREEN_RECODER_PACKET_CAPTURE_COMPLETED="Screen recoder capture completed"
+SCREEN_RECORDER_SUMMARY="Screen recorder: {frames} frames at {fps} fps in {duration:.3f} s ({captured} captured, {duplicated} duplicated, {dropped} dropped, {static} unchanged), drift {drift:.3f} s, max capture delay {max_delay:.3f} s, achieved {achieved_fps:.2f} fps, max encoder queue {max_queue}, {disk} bytes on disk, {memory} bytes of frame buffers"
+SCREEN_RECORDER_HASH_FAILED="Screen recorder: unable to hash the segment {} ({})"
+NETWORK_PACKET_CAPTURE_FILE_REMOVED="Packet capture: {} removed to stay within the disk budget, its hashes are in the files list"
+NETWORK_PACKET_CAPTURE_FILTER="Packet capture filter: {}"
+NETWORK_PACKET_CAPTURE_FILTER_FAILED="Packet capture filter {} can't be applied ({}), the hosts filter has been disabled"
+NETWORK_FLOW_INDEX="Packet capture: flow index of {} flows saved in {}"
+NETWORK_FLOW_INDEX_FAILED="Packet capture: unable to build the flow index ({})"
+NETWORK_TRAFFIC_SUMMARY="Packet capture: traffic summary of {} packets saved in {}"
+NETWORK_TRAFFIC_SUMMARY_FAILED="Packet capture: unable to build the traffic summary ({})"
+NETWORK_PACKET_CAPTURE_SUMMARY="Packet capture: {packets} packets ({bytes} bytes) in {duration:.3f} s, {rate:.1f} packets/s, {disk} bytes on disk, max capture buffer {max_memory} bytes"
 #NETTOOLS
 NSLOOKUP_GET="Get NSLOOKUP"
 NSLOOKUP_GET_INFO_URL="Get NSLOOKUP info for URL: {}"
@@ -28,14 +38,19 @@ TRACEROUTE_GET_INFO_URL="Get TRACEROUTE info for URL: {}"
 WHOIS_GET="Get WHOIS"
 WHOIS_GET_INFO_URL="Get WHOIS info for URL: {}"
 SSLKEYLOG_GET="Get SSLKEYLOG"
+SSLKEYLOG_BROWSER="SSLKEYLOG: {} keys logged by the browser during the acquisition"
 SSLCERTIFICATE_GET="Get SSL CERTIFICATE"
 SSLCERTIFICATE_GET_FROM_URL="Get SSL certificate from URL: {}"
 
+TLS_DECRYPT_FAILED="Unable to decrypt the TLS sessions of the packet capture ({})"
 CALCULATE_HASHFILE="Calculate acquisition file hash"
+CALCULATE_HASHFILE_FAILED="Unable to calculate the acquisition file hash ({})"
 GENERATE_PDF_REPORT_START="Generate PDF Report start"
 GENERATE_PDF_REPORT_STOP="Generate PDF Report stop"
 SCREENSHOT="Save screenshot of current page"
 SAVE_PAGE="Save all resource of current page"
+PRINT_PDF="Print current page to PDF"
+PRINT_PDF_FAILED="Unable to print current page to PDF"
 
 FETCH_EMAILS="Fetching e-mails"
 SEARCH_CRITERIA = "Search criteria: {}"
@@ -10,6 +10,7 @@ PACKET_CAPTURE="Packet Capture"
 SCREEN_RECORDER="Screen Recoder"
 SCREENSHOT="Take screenshot"
 SAVE_PAGE="Save page resources"
+PRINT_PDF="Save page as PDF"
 SAVE_EMAILS="Save emails"
 LOGIN="Login"
 FETCH_EMAILS="Fetch Emails"
@@ -19,7 +20,12 @@ HEADERS="Html Headers"
 TRACEROUTE="Traceroute"
 SSLKEYLOG="SSL Keylog"
 SSLCERTIFICATE="SSL Certificate"
+TLS_DECRYPT="Decrypt TLS sessions"
+TLS_DECRYPT_PROGRESS="Decrypt TLS sessions: {}%"
+TLS_DECRYPT_FAILED="Decrypt TLS sessions failed: {}"
 HASHFILE="Calculate Hash File"
+HASHFILE_PROGRESS="Calculate Hash File: {} ({}%)"
+HASHFILE_FAILED="Calculate Hash File failed: {}"
 REPORTFILE="Generate PDF Report"
 TIMESTAMP="Generate TIMESTAMP for the report"
 PEC="Send the PDF Report by PEC"
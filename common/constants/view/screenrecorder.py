@@ -8,3 +8,12 @@
 ######  
 
 SCREEN_RECODER="An error occurred during screen recoder acquisition! \nSee bellow for more detail."
+
+REGION_MONITOR="monitor"
+REGION_WINDOW="window"
+REGION_RECTANGLE="rectangle"
+REGIONS={
+    REGION_MONITOR: "Monitor",
+    REGION_WINDOW: "FIT window",
+    REGION_RECTANGLE: "Rectangle"
+}
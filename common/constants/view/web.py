@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+CAPTURE_MODE_SCROLL = "scroll"
+CAPTURE_MODE_OFFSCREEN = "offscreen"
+CAPTURE_MODES = {
+    CAPTURE_MODE_SCROLL: "Scroll and grab",
+    CAPTURE_MODE_OFFSCREEN: "Offscreen single render"
+}
+
+PDF_LAYOUT_PAGINATED = "paginated"
+PDF_LAYOUT_SINGLE_PAGE = "single"
+PDF_LAYOUTS = {
+    PDF_LAYOUT_PAGINATED: "Paginated (A4)",
+    PDF_LAYOUT_SINGLE_PAGE: "Single long page"
+}
+# PDF pages can't be higher than 14400 points (200 inches)
+PDF_MAX_PAGE_SIZE = 14400
+PDF_FILENAME = "screenshot.pdf"
+
+# interval (ms) between two readiness checks while a full page screenshot is taken
+READY_POLL_INTERVAL = 50
+
+# scroll the page and mark when the next two frames have been rendered
+SCROLL_SCRIPT = """
+(function() {{
+    window.__fit_target = {y};
+    window.__fit_rendered = false;
+    window.__fit_resources = -1;
+    window.scrollTo(0, {y});
+    requestAnimationFrame(function() {{
+        requestAnimationFrame(function() {{
+            window.__fit_rendered = true;
+        }});
+    }});
+}})();
+"""
+
+# true when the frames have been rendered at the requested position, the document
+# is loaded, no new resource has been fetched since the last check and the
+# images in the viewport are decoded
+READY_SCRIPT = """
+(function() {
+    if (!window.__fit_rendered || document.readyState !== 'complete') {
+        return false;
+    }
+    var element = document.scrollingElement || document.documentElement;
+    var target = Math.min(window.__fit_target, element.scrollHeight - window.innerHeight);
+    if (Math.abs(window.scrollY - Math.max(target, 0)) > 1) {
+        return false;
+    }
+    var resources = performance.getEntriesByType('resource').length;
+    var idle = resources === window.__fit_resources;
+    window.__fit_resources = resources;
+    if (!idle) {
+        return false;
+    }
+    return Array.prototype.every.call(document.images, function(image) {
+        var rect = image.getBoundingClientRect();
+        var visible = rect.bottom > 0 && rect.top < window.innerHeight;
+        return !visible || image.complete;
+    });
+})();
+"""
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from configparser import SafeConfigParser
+
+from common.merkle import MerkleTree
+
+DEFAULT_ALGORITHMS = ['md5', 'sha1', 'sha256']
+BUFFER_SIZE = 1024 * 1024
+HASH_MANIFEST_FILENAME = 'acquisition.manifest.json'
+
+LABELS = {
+    'md5': 'MD5',
+    'sha1': 'SHA-1',
+    'sha256': 'SHA-256'
+}
+
+# Digests computed while the artifacts were written, keyed by absolute path
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class MultiHash():
+    def __init__(self, algorithms=None, leaf_size=None):
+        self.algorithms = list(algorithms or DEFAULT_ALGORITHMS)
+        self.size = 0
+        self.merkle = MerkleTree(leaf_size) if leaf_size else None
+        self.__hashes = [hashlib.new(algorithm) for algorithm in self.algorithms]
+
+    def update(self, data):
+        for file_hash in self.__hashes:
+            file_hash.update(data)
+        if self.merkle is not None:
+            self.merkle.update(data)
+        self.size += len(data)
+
+    def hexdigests(self):
+        return {algorithm: file_hash.hexdigest() for algorithm, file_hash in zip(self.algorithms, self.__hashes)}
+
+
+class FileHash():
+    def __init__(self, filename, size, digests, name=None, merkle=None):
+        self.filename = filename
+        self.name = name or os.path.basename(filename)
+        self.size = size
+        self.digests = digests
+        self.merkle = merkle
+
+    def hexdigest(self, algorithm):
+        return self.digests[algorithm]
+
+    def lines(self):
+        lines = [self.name,
+                 '=========================================================',
+                 f'Size: {self.size}']
+        for algorithm, digest in self.digests.items():
+            lines.append(f'{LABELS.get(algorithm, algorithm.upper())}: {digest}\n')
+
+        return lines
+
+    def log(self, logger):
+        for line in self.lines():
+            logger.info(line)
+
+    def to_dict(self):
+        return dict({'name': self.name, 'size': self.size}, **self.digests)
+
+
+class HashingWriter():
+    def __init__(self, filename, algorithms=None, leaf_size=None):
+        self.filename = filename
+        self.name = filename
+        self.file_hash = None
+        self.__file = open(filename, 'wb')
+        self.__multi_hash = MultiHash(algorithms, leaf_size)
+
+    @property
+    def closed(self):
+        return self.__file.closed
+
+    def write(self, data):
+        size = self.__file.write(data)
+        self.__multi_hash.update(data)
+        return size
+
+    def tell(self):
+        return self.__multi_hash.size
+
+    def flush(self):
+        self.__file.flush()
+
+    def close(self):
+        if self.__file.closed:
+            return
+
+        self.__file.close()
+        self.file_hash = FileHash(self.filename, self.__multi_hash.size, self.__multi_hash.hexdigests(),
+                                  merkle=self.__multi_hash.merkle)
+        register_hash(self.file_hash)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def register_hash(file_hash):
+    stat = os.stat(file_hash.filename)
+    with _registry_lock:
+        _registry[os.path.abspath(file_hash.filename)] = (stat.st_size, stat.st_mtime_ns, file_hash)
+
+
+def get_registered_hash(filename, algorithms=None, leaf_size=None):
+    algorithms = algorithms or DEFAULT_ALGORITHMS
+    with _registry_lock:
+        entry = _registry.get(os.path.abspath(filename))
+    if entry is None:
+        return None
+
+    size, mtime_ns, file_hash = entry
+    stat = os.stat(filename)
+    # the file was touched after its digests were recorded
+    if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+        return None
+    if not set(algorithms).issubset(file_hash.digests):
+        return None
+    if leaf_size and (file_hash.merkle is None or file_hash.merkle.leaf_size != leaf_size):
+        return None
+
+    return FileHash(filename, file_hash.size, {algorithm: file_hash.digests[algorithm] for algorithm in algorithms},
+                    merkle=file_hash.merkle if leaf_size else None)
+
+
+def get_hash_workers():
+    parser = SafeConfigParser()
+    parser.read('assets/config.ini')
+    workers = parser.getint('fit_properties', 'hash_workers', fallback=0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+
+    return workers
+
+
+def is_hash_cache_enabled():
+    parser = SafeConfigParser()
+    parser.read('assets/config.ini')
+
+    return parser.getboolean('fit_properties', 'hash_cache', fallback=True)
+
+
+def calculate_hashes(filename, algorithms=None, buffer_size=BUFFER_SIZE, progress=None, leaf_size=None,
+                     cache=None, force=False):
+    # force skips the cache lookup (formal verification) but still refreshes it
+    if cache is not None and not force:
+        file_hash = cache.get(filename, algorithms, leaf_size)
+        if file_hash is not None:
+            if progress is not None:
+                progress(filename, file_hash.size)
+            return file_hash
+
+    # Read the file only once and feed every digest with the same buffer
+    multi_hash = MultiHash(algorithms, leaf_size)
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+
+    with open(filename, "rb", buffering=0) as f:
+        while size := f.readinto(buffer):
+            multi_hash.update(view[:size])
+            if progress is not None:
+                progress(filename, size)
+
+    file_hash = FileHash(filename, multi_hash.size, multi_hash.hexdigests(), merkle=multi_hash.merkle)
+    if cache is not None:
+        cache.store(file_hash)
+
+    return file_hash
+
+
+def walk_files(folder, exclude=None):
+    # relative names always use '/' so that manifests are portable
+    exclude = exclude or []
+    files = []
+    for root, dirs, filenames in os.walk(folder):
+        dirs.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, folder).replace(os.sep, '/')
+            if name not in exclude:
+                files.append((path, name))
+
+    return files
+
+
+def calculate_zip_member_hashes(filename, algorithms=None, workers=None):
+    # members are streamed out of the archive, nothing is extracted on disk
+    def hash_member(info):
+        multi_hash = MultiHash(algorithms)
+        with archive.open(info) as f:
+            while chunk := f.read(BUFFER_SIZE):
+                multi_hash.update(chunk)
+
+        return FileHash(filename + '/' + info.filename, multi_hash.size, multi_hash.hexdigests(), name=info.filename)
+
+    with zipfile.ZipFile(filename) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        with ThreadPoolExecutor(max_workers=workers or get_hash_workers()) as executor:
+            return list(executor.map(hash_member, members))
+
+
+def read_hash_log(filename):
+    # parse the blocks written by FileHash.log through the hashreport logger
+    algorithms = {label: algorithm for algorithm, label in LABELS.items()}
+    entries = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        lines = [line.rstrip('\n') for line in f]
+
+    for i, line in enumerate(lines):
+        if line.startswith('=====') and i > 0:
+            entries.append({'name': lines[i - 1], 'size': None, 'digests': {}})
+        elif entries and line.startswith('Size: '):
+            entries[-1]['size'] = int(line[len('Size: '):])
+        elif entries and ': ' in line:
+            label, digest = line.split(': ', 1)
+            if label in algorithms:
+                entries[-1]['digests'][algorithms[label]] = digest
+
+    return entries
+
+
+def write_hash_manifest(filename, hashes, archives=None):
+    manifest = {
+        'files': [file_hash.to_dict() for file_hash in hashes],
+        'archives': {name: [member.to_dict() for member in members] for name, members in (archives or {}).items()}
+    }
+    with open(filename, 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+    return manifest
+
+
+def calculate_hashes_parallel(filenames, algorithms=None, workers=None, progress=None, hashed=None, leaf_size=None,
+                              cache=None, force=False):
+    # hashlib releases the GIL on large buffers, so a thread pool is enough
+    # to keep several files (and disks) busy at the same time
+    results = {}
+    for filename in filenames:
+        file_hash = None if force else get_registered_hash(filename, algorithms, leaf_size)
+        if file_hash is not None:
+            results[filename] = file_hash
+            if hashed is not None:
+                hashed(file_hash)
+
+    with ThreadPoolExecutor(max_workers=workers or get_hash_workers()) as executor:
+        futures = {executor.submit(calculate_hashes, filename, algorithms, BUFFER_SIZE, progress, leaf_size,
+                                   cache, force): filename
+                   for filename in filenames if filename not in results}
+        for future in as_completed(futures):
+            file_hash = future.result()
+            results[futures[future]] = file_hash
+            if hashed is not None:
+                hashed(file_hash)
+
+    return [results[filename] for filename in filenames]
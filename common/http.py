@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+import struct
+import zlib
+
+import brotli
+from scapy.contrib.http2 import HPackHdrTable, HPackZString
+
+HTTP2_PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+
+FRAME_DATA = 0
+FRAME_HEADERS = 1
+FRAME_PUSH_PROMISE = 5
+FRAME_CONTINUATION = 9
+
+FLAG_END_HEADERS = 0x04
+FLAG_PADDED = 0x08
+FLAG_PRIORITY = 0x20
+
+HPACK_STATIC_TABLE_SIZE = 61
+HPACK_TABLE_SIZE = 4096
+
+# responses without a body whatever their headers say
+NO_BODY_STATUSES = (204, 304)
+
+
+class HPackDecoder():
+    # header blocks of one direction of a HTTP/2 connection, the dynamic table is shared by all its streams
+    static_table = None
+
+    def __init__(self):
+        if HPackDecoder.static_table is None:
+            table = HPackHdrTable()
+            HPackDecoder.static_table = [(table[i].name(), table[i].value())
+                                         for i in range(1, HPACK_STATIC_TABLE_SIZE + 1)]
+        self.table = []
+        self.size = 0
+        self.max_size = HPACK_TABLE_SIZE
+
+    def decode(self, block):
+        headers = []
+        position = 0
+        while position < len(block):
+            byte = block[position]
+            if byte & 0x80:
+                index, position = _integer(block, position, 7)
+                headers.append(self.__entry(index))
+            elif byte & 0xc0 == 0x40 or byte & 0xe0 == 0:
+                # literal with incremental indexing (6 bits prefix), without indexing or never indexed (4 bits)
+                index, position = _integer(block, position, 6 if byte & 0x40 else 4)
+                if index:
+                    name = self.__entry(index)[0]
+                else:
+                    name, position = _string(block, position)
+                value, position = _string(block, position)
+                headers.append((name, value))
+                if byte & 0x40:
+                    self.__add(name, value)
+            else:
+                self.max_size, position = _integer(block, position, 5)
+                self.__evict(0)
+
+        return headers
+
+    def __entry(self, index):
+        if index <= HPACK_STATIC_TABLE_SIZE:
+            return self.static_table[index - 1]
+        return self.table[index - HPACK_STATIC_TABLE_SIZE - 1]
+
+    def __add(self, name, value):
+        size = 32 + len(name.encode()) + len(value.encode())
+        self.__evict(size)
+        if size <= self.max_size:
+            self.table.insert(0, (name, value))
+            self.size += size
+
+    def __evict(self, size):
+        while self.table and self.size + size > self.max_size:
+            name, value = self.table.pop()
+            self.size -= 32 + len(name.encode()) + len(value.encode())
+
+
+def _integer(block, position, prefix):
+    mask = (1 << prefix) - 1
+    value = block[position] & mask
+    position += 1
+    if value == mask:
+        shift = 0
+        while True:
+            byte = block[position]
+            position += 1
+            value += (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+
+    return value, position
+
+
+def _string(block, position):
+    huffman = block[position] & 0x80
+    length, position = _integer(block, position, 7)
+    value = block[position:position + length]
+    if huffman:
+        value = HPackZString.huffman_decode(int.from_bytes(value, 'big'), len(value) * 8)
+    # huffman_decode returns bytes up to scapy 2.5 and str since 2.6
+    if isinstance(value, str):
+        return value, position + length
+
+    return value.decode('utf-8', 'replace'), position + length
+
+
+def decode_body(body, headers):
+    # (body without its content encoding, encoding removed), the body as sent when it can't be decoded
+    encoding = header(headers, 'content-encoding')
+    if not body or not encoding or encoding == 'identity':
+        return body, None
+
+    try:
+        if encoding in ('gzip', 'x-gzip'):
+            return zlib.decompress(body, 16 + zlib.MAX_WBITS), encoding
+        if encoding == 'deflate':
+            try:
+                return zlib.decompress(body), encoding
+            except zlib.error:
+                return zlib.decompress(body, -zlib.MAX_WBITS), encoding
+        if encoding == 'br':
+            return brotli.decompress(body), encoding
+    except Exception:
+        pass
+
+    return body, None
+
+
+def header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value.strip().lower()
+
+    return None
+
+
+def exchanges(client, server):
+    # requests and responses of a decrypted connection, HTTP/2 when the client starts with its preface
+    if client.data.startswith(HTTP2_PREFACE):
+        return _http2_exchanges(client, server)
+    return _http1_exchanges(client, server)
+
+
+def _exchange(version, stream_id=None):
+    return {
+        'version': version, 'stream': stream_id,
+        'method': None, 'scheme': None, 'authority': None, 'path': None,
+        'request_time': None, 'request_headers': [], 'request_body': bytearray(),
+        'status': None, 'response_time': None, 'response_headers': [], 'response_body': bytearray()
+    }
+
+
+def _http1_messages(stream, methods=None):
+    # (offset, start line, headers, body) of each message, the methods of the requests tell which responses have a body
+    data = stream.data
+    position = 0
+    while position < len(data):
+        message = position
+        end = data.find(b'\r\n\r\n', position)
+        if end < 0:
+            return
+        lines = data[position:end].decode('iso-8859-1').split('\r\n')
+        headers = [(name.strip(), value.strip()) for name, _, value in
+                   (line.partition(':') for line in lines[1:])]
+        start = end + 4
+
+        if methods is not None:
+            try:
+                status = int(lines[0].split()[1])
+            except (IndexError, ValueError):
+                return
+            if 100 <= status < 200:
+                yield message, lines[0], headers, None
+                if status == 101:
+                    # the connection switched to another protocol (e.g. WebSocket)
+                    return
+                position = start
+                continue
+            method = methods.pop(0) if methods else None
+            if method == 'HEAD' or status in NO_BODY_STATUSES:
+                yield message, lines[0], headers, b''
+                position = start
+                continue
+
+        if header(headers, 'transfer-encoding') == 'chunked':
+            body, position = _dechunk(data, start)
+        elif header(headers, 'content-length') is not None:
+            try:
+                length = int(header(headers, 'content-length'))
+            except ValueError:
+                length = 0
+            body, position = data[start:start + length], start + length
+        elif methods is not None:
+            # the response ends with the connection
+            body, position = data[start:], len(data)
+        else:
+            body, position = b'', start
+
+        yield message, lines[0], headers, body
+
+
+def _dechunk(data, position):
+    body = bytearray()
+    while True:
+        end = data.find(b'\r\n', position)
+        if end < 0:
+            return bytes(body), len(data)
+        try:
+            length = int(data[position:end].split(b';')[0], 16)
+        except ValueError:
+            return bytes(body), len(data)
+        position = end + 2
+        if length == 0:
+            # the trailers end with an empty line
+            end = data.find(b'\r\n\r\n', position - 2)
+            return bytes(body), (end + 4) if end >= 0 else len(data)
+        body += data[position:position + length]
+        position += length + 2
+
+
+def _http1_exchanges(client, server):
+    result = []
+    methods = []
+    for offset, line, headers, body in _http1_messages(client):
+        method, _, rest = line.partition(' ')
+        target, _, version = rest.rpartition(' ')
+        exchange = _exchange(version or 'HTTP/1.0')
+        exchange.update(method=method, path=target, authority=header(headers, 'host'),
+                        request_time=client.timestamp(offset), request_headers=headers, request_body=body)
+        result.append(exchange)
+        methods.append(method)
+
+    responses = iter(result)
+    exchange = None
+    for offset, line, headers, body in _http1_messages(server, methods):
+        if body is None:
+            # an interim response (e.g. 100 Continue) of the next request
+            continue
+        exchange = next(responses, None)
+        if exchange is None:
+            exchange = _exchange(line.split(' ')[0])
+            result.append(exchange)
+        try:
+            exchange['status'] = int(line.split()[1])
+        except (IndexError, ValueError):
+            pass
+        exchange.update(response_time=server.timestamp(offset), response_headers=headers, response_body=body)
+
+    return result
+
+
+def _http2_frames(data, position):
+    # (offset, type, flags, stream, payload without padding and priority) of the complete frames
+    while position + 9 <= len(data):
+        length = struct.unpack('!I', b'\x00' + data[position:position + 3])[0]
+        frame_type, flags, stream_id = struct.unpack('!BBI', data[position + 3:position + 9])
+        if position + 9 + length > len(data):
+            return
+        payload = data[position + 9:position + 9 + length]
+        if frame_type in (FRAME_DATA, FRAME_HEADERS, FRAME_PUSH_PROMISE) and flags & FLAG_PADDED and payload:
+            payload = payload[1:len(payload) - payload[0]]
+        if frame_type == FRAME_HEADERS and flags & FLAG_PRIORITY:
+            payload = payload[5:]
+        yield position, frame_type, flags, stream_id & 0x7fffffff, payload
+        position += 9 + length
+
+
+def _http2_exchanges(client, server):
+    streams = {}
+
+    def exchange(stream_id):
+        if stream_id not in streams:
+            streams[stream_id] = _exchange('HTTP/2', stream_id)
+        return streams[stream_id]
+
+    for stream, position, request in ((client, len(HTTP2_PREFACE), True), (server, 0, False)):
+        decoder = HPackDecoder()
+        block = None
+        for offset, frame_type, flags, stream_id, payload in _http2_frames(stream.data, position):
+            if frame_type == FRAME_DATA and stream_id:
+                exchange(stream_id)['request_body' if request else 'response_body'] += payload
+                continue
+            if frame_type == FRAME_HEADERS:
+                block = [stream_id, offset, request, payload]
+            elif frame_type == FRAME_PUSH_PROMISE and len(payload) >= 4:
+                # the server pushes a response to a request it made up for the client
+                block = [struct.unpack('!I', payload[:4])[0] & 0x7fffffff, offset, True, payload[4:]]
+            elif frame_type == FRAME_CONTINUATION and block is not None:
+                block[3] += payload
+            else:
+                continue
+
+            if flags & FLAG_END_HEADERS:
+                # every block is decoded, the dynamic table would be wrong otherwise
+                block_stream, block_offset, block_request, data = block
+                headers = decoder.decode(data)
+                block = None
+                _http2_headers(exchange(block_stream), stream.timestamp(block_offset), block_request, headers)
+
+    return [streams[stream_id] for stream_id in sorted(streams)]
+
+
+def _http2_headers(exchange, timestamp, request, headers):
+    pseudo = dict((name, value) for name, value in headers if name.startswith(':'))
+    headers = [(name, value) for name, value in headers if not name.startswith(':')]
+    if request:
+        if exchange['method'] is None:
+            exchange.update(method=pseudo.get(':method'), scheme=pseudo.get(':scheme'),
+                            authority=pseudo.get(':authority'), path=pseudo.get(':path'),
+                            request_time=timestamp, request_headers=headers)
+        return
+
+    try:
+        status = int(pseudo.get(':status'))
+    except (TypeError, ValueError):
+        status = None
+    # interim responses come before the final one, the trailers after it
+    if exchange['status'] is None and status is not None and status >= 200:
+        exchange.update(status=status, response_time=timestamp, response_headers=headers)
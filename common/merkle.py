@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from configparser import SafeConfigParser
+
+LEAF_SIZE = 4 * 1024 * 1024
+ALGORITHM = 'sha256'
+MANIFEST_FILENAME = 'acquisition.merkle.json'
+MANIFEST_VERSION = 1
+
+# Domain separation between leaves and inner nodes (as in RFC 6962)
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+class MerkleTree():
+    def __init__(self, leaf_size=LEAF_SIZE, algorithm=ALGORITHM):
+        self.leaf_size = leaf_size
+        self.algorithm = algorithm
+        self.leaves = []
+        self.__leaf = hashlib.new(self.algorithm, LEAF_PREFIX)
+        self.__leaf_bytes = 0
+        self.__is_finalized = False
+
+    @classmethod
+    def from_leaves(cls, leaves, leaf_size=LEAF_SIZE, algorithm=ALGORITHM):
+        tree = cls(leaf_size, algorithm)
+        tree.leaves = list(leaves)
+        tree.__is_finalized = True
+
+        return tree
+
+    def update(self, data):
+        view = memoryview(data)
+        while len(view) > 0:
+            size = min(len(view), self.leaf_size - self.__leaf_bytes)
+            self.__leaf.update(view[:size])
+            self.__leaf_bytes += size
+            view = view[size:]
+            if self.__leaf_bytes == self.leaf_size:
+                self.__close_leaf()
+
+    def finalize(self):
+        if not self.__is_finalized:
+            # an empty file still has one (empty) leaf
+            if self.__leaf_bytes > 0 or len(self.leaves) == 0:
+                self.__close_leaf()
+            self.__is_finalized = True
+
+        return self
+
+    def root(self):
+        return merkle_root(self.finalize().leaves, self.algorithm)
+
+    def __close_leaf(self):
+        self.leaves.append(self.__leaf.hexdigest())
+        self.__leaf = hashlib.new(self.algorithm, LEAF_PREFIX)
+        self.__leaf_bytes = 0
+
+
+def get_merkle_leaf_size():
+    parser = SafeConfigParser()
+    parser.read('assets/config.ini')
+
+    return parser.getint('fit_properties', 'merkle_leaf_size', fallback=LEAF_SIZE)
+
+
+def merkle_root(leaves, algorithm=ALGORITHM):
+    level = [bytes.fromhex(leaf) for leaf in leaves]
+    while len(level) > 1:
+        parents = []
+        for i in range(0, len(level) - 1, 2):
+            parents.append(hashlib.new(algorithm, NODE_PREFIX + level[i] + level[i + 1]).digest())
+        # an odd node is promoted to the next level unchanged
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+
+    return level[0].hex()
+
+
+def write_manifest(filename, hashes, leaf_size, algorithm=ALGORITHM):
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'algorithm': algorithm,
+        'leaf_size': leaf_size,
+        'files': {}
+    }
+    for file_hash in hashes:
+        if file_hash.merkle is None:
+            continue
+        tree = file_hash.merkle.finalize()
+        manifest['files'][file_hash.name] = {
+            'size': file_hash.size,
+            'root': tree.root(),
+            'leaves': tree.leaves
+        }
+
+    with open(filename, 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+
+    return manifest
+
+
+def read_manifest(filename):
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def hash_leaf(filename, index, leaf_size, algorithm=ALGORITHM):
+    leaf = hashlib.new(algorithm, LEAF_PREFIX)
+    with open(filename, 'rb') as f:
+        f.seek(index * leaf_size)
+        leaf.update(f.read(leaf_size))
+
+    return leaf.hexdigest()
+
+
+def verify_manifest(folder, manifest, indices=None, workers=None):
+    # indices: optional {name: [leaf index, ...]} to re-verify only some chunks
+    leaf_size = manifest['leaf_size']
+    algorithm = manifest['algorithm']
+    results = {}
+    jobs = []
+
+    for name, entry in manifest['files'].items():
+        filename = os.path.join(folder, name)
+        if not os.path.isfile(filename):
+            results[name] = {'status': 'missing', 'altered': []}
+            continue
+
+        results[name] = {'status': 'ok', 'altered': []}
+        size = os.path.getsize(filename)
+        leaves = max(1, -(-size // leaf_size))
+        if size != entry['size']:
+            results[name]['status'] = 'altered'
+
+        to_verify = indices.get(name, []) if indices is not None else range(max(leaves, len(entry['leaves'])))
+        for index in to_verify:
+            if index >= leaves or index >= len(entry['leaves']):
+                results[name]['altered'].append(index)
+            else:
+                jobs.append((name, filename, index))
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        digests = executor.map(lambda job: hash_leaf(job[1], job[2], leaf_size, algorithm), jobs)
+        for (name, filename, index), digest in zip(jobs, digests):
+            if digest != manifest['files'][name]['leaves'][index]:
+                results[name]['altered'].append(index)
+
+    for name, result in results.items():
+        result['altered'].sort()
+        if result['altered']:
+            result['status'] = 'altered'
+        # byte ranges of the altered chunks
+        result['regions'] = [(index * leaf_size, (index + 1) * leaf_size) for index in result['altered']]
+
+    return results
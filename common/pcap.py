@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+import array
+import bisect
+import json
+import os
+import socket
+import struct
+import tempfile
+
+from common.hashing import HashingWriter
+
+PCAP_MAGIC_MICRO = 0xa1b2c3d4
+PCAP_MAGIC_NANO = 0xa1b23c4d
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86dd
+ETHERTYPE_VLAN = (0x8100, 0x88a8, 0x9100)
+
+IP_PROTOCOLS = {1: 'icmp', 6: 'tcp', 17: 'udp', 58: 'icmpv6'}
+IPV6_EXTENSION_HEADERS = (0, 43, 60)
+IPV6_FRAGMENT_HEADER = 44
+
+TCP_SYN = 0x02
+
+WELL_KNOWN_PORTS = 1024
+HTTP_METHODS = (b'GET ', b'POST ', b'HEAD ', b'PUT ', b'DELETE ', b'OPTIONS ', b'PATCH ', b'CONNECT ', b'TRACE ')
+# bytes of a request looked at for the Host header
+HTTP_MAX_HEADERS = 8192
+# packet offsets kept in memory by the flow index before they are moved to a temporary file (12 bytes each)
+FLOW_INDEX_SPILL_ENTRIES = 1 << 20
+
+DNS_PORT = 53
+DNS_TYPES = {1: 'A', 5: 'CNAME', 28: 'AAAA'}
+# compression pointers followed in a name before the message is considered broken
+DNS_MAX_POINTERS = 16
+
+# distinct values kept by each counter of the traffic summary, whatever the size of the capture
+SUMMARY_CAPACITY = 10000
+# values (answers, names) kept for each counted value
+SUMMARY_MAX_VALUES = 10
+# rows of each table saved in the summary
+SUMMARY_MAX_ROWS = 100
+
+FLOW_INDEX_SUFFIX = '_flows.json'
+TRAFFIC_SUMMARY_SUFFIX = '_traffic.json'
+
+
+def read_packets(filename):
+    # (linktype, offset, timestamp, captured bytes, original length) of every record, one at a time
+    with open(filename, 'rb') as f:
+        header = _read_header(f, filename)
+        if header is None:
+            return
+
+        offset = 24
+        while True:
+            packet = _read_record(f, offset, *header)
+            if packet is None:
+                return
+            yield packet
+            offset += 16 + len(packet[3])
+
+
+def read_packets_at(filename, offsets):
+    # the records at the offsets of a flow index, without reading the rest of the file
+    with open(filename, 'rb') as f:
+        header = _read_header(f, filename)
+        if header is None:
+            return
+
+        for offset in offsets:
+            f.seek(offset)
+            packet = _read_record(f, offset, *header)
+            if packet is None:
+                return
+            yield packet
+
+
+def _read_header(f, filename):
+    header = f.read(24)
+    if len(header) < 24:
+        return None
+
+    for endianness in ('<', '>'):
+        magic, = struct.unpack(endianness + 'I', header[:4])
+        if magic in (PCAP_MAGIC_MICRO, PCAP_MAGIC_NANO):
+            break
+    else:
+        raise ValueError('{} is not a pcap file'.format(filename))
+
+    linktype = struct.unpack(endianness + 'I', header[20:24])[0] & 0x0fffffff
+    divisor = 1000000000 if magic == PCAP_MAGIC_NANO else 1000000
+    return linktype, divisor, struct.Struct(endianness + 'IIII')
+
+
+def _read_record(f, offset, linktype, divisor, record):
+    data = f.read(record.size)
+    if len(data) < record.size:
+        return None
+    seconds, fraction, caplen, wirelen = record.unpack(data)
+    data = f.read(caplen)
+    if len(data) < caplen:
+        return None
+
+    return linktype, offset, seconds + fraction / divisor, data, wirelen
+
+
+def parse_packet(linktype, data):
+    # (protocol, source, source port, destination, destination port, payload) of IP packets, None otherwise
+    transport = _transport_layer(linktype, data)
+    if transport is None:
+        return None
+
+    protocol, source, destination, data = transport
+    name = IP_PROTOCOLS.get(protocol, str(protocol))
+    if data is None:
+        # only the first fragment has the ports
+        return name, source, 0, destination, 0, b''
+    if protocol == 6 and len(data) >= 20:
+        source_port, destination_port = struct.unpack('!HH', data[:4])
+        return name, source, source_port, destination, destination_port, data[(data[12] >> 4) * 4:]
+    if protocol == 17 and len(data) >= 8:
+        source_port, destination_port = struct.unpack('!HH', data[:4])
+        return name, source, source_port, destination, destination_port, data[8:]
+
+    return name, source, 0, destination, 0, b''
+
+
+def parse_tcp(linktype, data):
+    # (source, source port, destination, destination port, sequence number, flags, payload) of TCP segments
+    transport = _transport_layer(linktype, data)
+    if transport is None or transport[0] != 6 or transport[3] is None or len(transport[3]) < 20:
+        return None
+
+    protocol, source, destination, data = transport
+    source_port, destination_port, sequence = struct.unpack('!HHI', data[:8])
+    return source, source_port, destination, destination_port, sequence, data[13], data[(data[12] >> 4) * 4:]
+
+
+def _transport_layer(linktype, data):
+    # (IP protocol, source, destination, transport data) of IP packets, the data is None for later fragments
+    ethertype, data = _network_layer(linktype, data)
+    if ethertype == ETHERTYPE_IPV4 and len(data) >= 20:
+        header_length = (data[0] & 0x0f) * 4
+        protocol = data[9]
+        fragment_offset = struct.unpack('!H', data[6:8])[0] & 0x1fff
+        source = socket.inet_ntop(socket.AF_INET, data[12:16])
+        destination = socket.inet_ntop(socket.AF_INET, data[16:20])
+        total_length = struct.unpack('!H', data[2:4])[0]
+        # a 0 total length is left by TCP segmentation offload on outgoing packets
+        data = data[header_length:total_length if total_length > header_length else len(data)]
+        return protocol, source, destination, None if fragment_offset else data
+    if ethertype == ETHERTYPE_IPV6 and len(data) >= 40:
+        protocol = data[6]
+        source = socket.inet_ntop(socket.AF_INET6, data[8:24])
+        destination = socket.inet_ntop(socket.AF_INET6, data[24:40])
+        data = data[40:]
+        while protocol in IPV6_EXTENSION_HEADERS + (IPV6_FRAGMENT_HEADER,) and len(data) >= 8:
+            if protocol == IPV6_FRAGMENT_HEADER:
+                if struct.unpack('!H', data[2:4])[0] & 0xfff8:
+                    return data[0], source, destination, None
+                protocol, data = data[0], data[8:]
+            else:
+                protocol, data = data[0], data[(data[1] + 1) * 8:]
+        return protocol, source, destination, data
+
+    return None
+
+
+def _network_layer(linktype, data):
+    if linktype == LINKTYPE_ETHERNET:
+        ethertype, data = (struct.unpack('!H', data[12:14])[0] if len(data) >= 14 else 0), data[14:]
+        while ethertype in ETHERTYPE_VLAN and len(data) >= 4:
+            ethertype, data = struct.unpack('!H', data[2:4])[0], data[4:]
+        return ethertype, data
+    if linktype == LINKTYPE_LINUX_SLL:
+        return (struct.unpack('!H', data[14:16])[0] if len(data) >= 16 else 0), data[16:]
+    if linktype == LINKTYPE_LINUX_SLL2:
+        return (struct.unpack('!H', data[0:2])[0] if len(data) >= 20 else 0), data[20:]
+    if linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        # the address family is in the byte order of the capturing host
+        family = struct.unpack('<I', data[:4])[0] if len(data) >= 4 else 0
+        if family > 0xffff:
+            family = struct.unpack('>I', data[:4])[0]
+        return (ETHERTYPE_IPV4 if family == 2 else ETHERTYPE_IPV6 if family in (10, 24, 28, 30) else 0), data[4:]
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6) and data:
+        return (ETHERTYPE_IPV4 if data[0] >> 4 == 4 else ETHERTYPE_IPV6 if data[0] >> 4 == 6 else 0), data
+
+    return 0, data
+
+
+class Stream():
+    # the bytes sent in one direction of a connection and when they were captured
+    def __init__(self, data=b'', marks=None, complete=True):
+        self.data = data
+        # (offset, timestamp) of every chunk, sorted by offset
+        self.marks = marks or []
+        self.complete = complete
+
+    def timestamp(self, offset):
+        position = bisect.bisect_right(self.marks, (offset, float('inf'))) - 1
+        return self.marks[max(position, 0)][1] if self.marks else None
+
+
+def reassemble(segments):
+    # Stream of (sequence number, flags, payload, timestamp) segments, up to the first missing one
+    start = None
+    for sequence, flags, payload, timestamp in segments:
+        if flags & TCP_SYN:
+            start = (sequence + 1) & 0xffffffff
+            break
+    else:
+        # the capture started after the handshake
+        sequences = [sequence for sequence, flags, payload, timestamp in segments if payload]
+        if not sequences:
+            return Stream()
+        start = sequences[0]
+
+    data = bytearray()
+    marks = []
+    complete = True
+    # retransmissions are sorted after the first copy of the same bytes
+    for relative, index, payload, timestamp in sorted(
+            ((sequence - start) & 0xffffffff, index, payload, timestamp)
+            for index, (sequence, flags, payload, timestamp) in enumerate(segments) if payload):
+        if relative >= 0x80000000:
+            # sent before the first byte (e.g. the capture started mid segment)
+            continue
+        if relative > len(data):
+            complete = False
+            break
+        overlap = len(data) - relative
+        if overlap < len(payload):
+            marks.append((len(data), timestamp))
+            data += payload[overlap:]
+
+    return Stream(bytes(data), marks, complete)
+
+
+def read_flow_index(filename):
+    # the flows of an index written by FlowIndex.write, one at a time
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.rstrip().rstrip(',')
+            if line.startswith('{"protocol"'):
+                yield json.loads(line)
+
+
+def tls_server_name(payload):
+    # the server name of a TLS ClientHello, if the whole extension is in this segment
+    try:
+        if len(payload) < 43 or payload[0] != 0x16 or payload[1] != 0x03 or payload[5] != 0x01:
+            return None
+        position = 9 + 2 + 32
+        position += 1 + payload[position]
+        position += 2 + struct.unpack('!H', payload[position:position + 2])[0]
+        position += 1 + payload[position]
+        end = position + 2 + struct.unpack('!H', payload[position:position + 2])[0]
+        position += 2
+        while position + 4 <= min(end, len(payload)):
+            extension, length = struct.unpack('!HH', payload[position:position + 4])
+            position += 4
+            if extension == 0:
+                # server name list: length, type (0 = host name), name length, name
+                name_length = struct.unpack('!H', payload[position + 3:position + 5])[0]
+                name = payload[position + 5:position + 5 + name_length]
+                return name.decode('ascii') if len(name) == name_length else None
+            position += length
+    except (IndexError, struct.error, UnicodeDecodeError):
+        pass
+
+    return None
+
+
+def http_host(payload):
+    if not payload.startswith(HTTP_METHODS):
+        return None
+
+    headers = payload[:HTTP_MAX_HEADERS].split(b'\r\n\r\n', 1)[0]
+    for line in headers.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'host':
+            return value.strip().decode('ascii', 'replace')
+
+    return None
+
+
+def dns_message(payload):
+    # (response, questions, [(question, type, value)]) of the A, AAAA and CNAME answers, None if not DNS
+    try:
+        flags, questions, answers = struct.unpack('!HHH', payload[2:8])
+        names = []
+        position = 12
+        for i in range(questions):
+            name, position = _dns_name(payload, position)
+            names.append(name)
+            position += 4
+
+        records = []
+        for i in range(answers):
+            name, position = _dns_name(payload, position)
+            record_type, length = struct.unpack('!H6xH', payload[position:position + 10])
+            position += 10
+            if record_type == 1 and length == 4:
+                records.append((record_type, socket.inet_ntop(socket.AF_INET, payload[position:position + 4])))
+            elif record_type == 28 and length == 16:
+                records.append((record_type, socket.inet_ntop(socket.AF_INET6, payload[position:position + 16])))
+            elif record_type == 5:
+                records.append((record_type, _dns_name(payload, position)[0]))
+            position += length
+    except (IndexError, struct.error, ValueError, UnicodeDecodeError):
+        return None
+
+    # the answers of a CNAME chain are given to the name asked by the client
+    question = names[0] if names else None
+    return bool(flags & 0x8000), names, [(question, record_type, value) for record_type, value in records]
+
+
+def _dns_name(payload, position):
+    labels = []
+    end = None
+    for i in range(DNS_MAX_POINTERS):
+        while payload[position] and payload[position] < 0xc0:
+            labels.append(payload[position + 1:position + 1 + payload[position]].decode('ascii'))
+            position += 1 + payload[position]
+        if not payload[position]:
+            return '.'.join(labels).lower(), end or position + 1
+        end = end or position + 2
+        position = struct.unpack('!H', payload[position:position + 2])[0] & 0x3fff
+
+    raise ValueError('too many DNS compression pointers')
+
+
+class TopCounter():
+    # approximate heavy hitters: when full the least counted half is dropped, memory never grows past capacity
+    def __init__(self, capacity=SUMMARY_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.approximate = False
+
+    def add(self, key, packets=1, size=0):
+        entry = self.counts.get(key)
+        if entry is None:
+            if len(self.counts) >= self.capacity:
+                self.__prune()
+            entry = self.counts[key] = [0, 0, []]
+        entry[0] += packets
+        entry[1] += size
+        return entry
+
+    def most_common(self, rows=SUMMARY_MAX_ROWS):
+        return sorted(self.counts.items(), key=lambda item: (item[1][1], item[1][0]), reverse=True)[:rows]
+
+    def __prune(self):
+        self.counts = dict(self.most_common(self.capacity // 2))
+        self.approximate = True
+
+
+def _add_value(values, value):
+    if value not in values and len(values) < SUMMARY_MAX_VALUES:
+        values.append(value)
+
+
+class TrafficSummary():
+    # what happened on the network, in memory bounded by SUMMARY_CAPACITY for captures of any size
+    def __init__(self):
+        self.files = []
+        self.packets = 0
+        self.bytes = 0
+        self.first = None
+        self.last = None
+        self.protocols = {}
+        self.hosts = TopCounter()
+        self.names = TopCounter()
+        self.dns = TopCounter()
+        self.server_names = TopCounter()
+
+    def add_file(self, filename):
+        self.files.append(os.path.basename(filename))
+
+    def add(self, file_index, offset, timestamp, wirelen, packet):
+        self.packets += 1
+        self.bytes += wirelen
+        self.first = timestamp if self.first is None else min(self.first, timestamp)
+        self.last = timestamp if self.last is None else max(self.last, timestamp)
+
+        # None for the packets that aren't IP (e.g. ARP)
+        protocol = packet[0] if packet is not None else None
+        counts = self.protocols.setdefault(protocol, [0, 0])
+        counts[0] += 1
+        counts[1] += wirelen
+        if packet is None:
+            return
+
+        protocol, source, source_port, destination, destination_port, payload = packet
+        self.hosts.add(source, 1, wirelen)
+        self.hosts.add(destination, 1, wirelen)
+        if not payload:
+            return
+
+        if protocol == 'udp' and DNS_PORT in (source_port, destination_port):
+            self.__add_dns(payload)
+        elif protocol == 'tcp' and payload[0] == 0x16:
+            server_name = tls_server_name(payload)
+            if server_name is not None:
+                self.server_names.add(server_name.lower(), 1, 0)
+
+    def __add_dns(self, payload):
+        message = dns_message(payload)
+        if message is None:
+            return
+
+        response, questions, answers = message
+        if not response:
+            for question in questions:
+                self.dns.add(question, 1, 0)
+        for question, record_type, value in answers:
+            _add_value(self.dns.add(question, 0, 0)[2], DNS_TYPES[record_type] + ' ' + value)
+            if record_type != 5:
+                _add_value(self.names.add(value, 1, 0)[2], question)
+
+    def write(self, filename, leaf_size=None):
+        hosts = []
+        for address, (packets, size, values) in self.hosts.most_common():
+            names = self.names.counts.get(address)
+            hosts.append({'address': address, 'names': names[2] if names else [], 'packets': packets, 'bytes': size})
+
+        summary = {
+            'files': self.files,
+            'packets': self.packets, 'bytes': self.bytes, 'first': self.first, 'last': self.last,
+            'protocols': [{'protocol': protocol, 'packets': packets, 'bytes': size}
+                          for protocol, (packets, size) in
+                          sorted(self.protocols.items(), key=lambda item: item[1][1], reverse=True)],
+            'hosts': hosts,
+            'dns': [{'name': name, 'queries': packets, 'answers': answers}
+                    for name, (packets, size, answers) in self.dns.most_common()],
+            'tls': [{'server_name': name, 'connections': packets}
+                    for name, (packets, size, values) in self.server_names.most_common()],
+            # counts of the less frequent values can be lower than the real ones
+            'approximate': any(counter.approximate for counter in (self.hosts, self.dns, self.server_names))
+        }
+
+        with HashingWriter(filename, leaf_size=leaf_size) as f:
+            f.write(json.dumps(summary, indent=1).encode())
+
+        return f.file_hash
+
+
+class FlowIndex():
+    # flows of one or more pcap files, both directions of a connection are the same flow.
+    # The flows stay in memory (a few hundred bytes each), the offsets of their packets
+    # are moved to a temporary file every spill_entries packets
+    def __init__(self, spill_entries=FLOW_INDEX_SPILL_ENTRIES):
+        self.flows = {}
+        self.files = []
+        self.spill_entries = spill_entries
+        self.__entries = 0
+        self.__spill = None
+
+    def add_file(self, filename):
+        self.files.append(os.path.basename(filename))
+
+    def add(self, file_index, offset, timestamp, wirelen, packet):
+        if packet is None:
+            return
+
+        protocol, source, source_port, destination, destination_port, payload = packet
+        key = (protocol,) + tuple(sorted([(source, source_port), (destination, destination_port)]))
+        flow = self.flows.get(key)
+        if flow is None:
+            client, server = (source, source_port), (destination, destination_port)
+            # an answer seen first (e.g. the capture started mid connection): servers use well known ports
+            if source_port and source_port < WELL_KNOWN_PORTS <= destination_port:
+                client, server = server, client
+            flow = self.flows[key] = {
+                'protocol': protocol, 'client': client[0], 'client_port': client[1],
+                'server': server[0], 'server_port': server[1],
+                'packets': 0, 'bytes': 0, 'first': timestamp, 'last': timestamp,
+                'sni': None, 'host': None,
+                'files': array.array('I'), 'offsets': array.array('Q'), 'chunks': []
+            }
+
+        flow['packets'] += 1
+        flow['bytes'] += wirelen
+        flow['first'] = min(flow['first'], timestamp)
+        flow['last'] = max(flow['last'], timestamp)
+        flow['files'].append(file_index)
+        flow['offsets'].append(offset)
+        self.__entries += 1
+        if self.__entries >= self.spill_entries:
+            self.__spill_offsets()
+        if payload and protocol == 'tcp':
+            if flow['sni'] is None:
+                flow['sni'] = tls_server_name(payload)
+            if flow['host'] is None:
+                flow['host'] = http_host(payload)
+
+    def write(self, filename, leaf_size=None):
+        # one flow per line, the index is written without building it all in memory again
+        with HashingWriter(filename, leaf_size=leaf_size) as f:
+            f.write(('{"files": ' + json.dumps(self.files) + ', "flows": [\n').encode())
+            flows = sorted(self.flows.values(), key=lambda flow: flow['first'])
+            for i, flow in enumerate(flows):
+                offsets = {}
+                for files, flow_offsets in self.__flow_offsets(flow):
+                    for file_index, offset in zip(files, flow_offsets):
+                        offsets.setdefault(self.files[file_index], []).append(offset)
+                flow = dict(flow, offsets=offsets)
+                del flow['files'], flow['chunks']
+                f.write((json.dumps(flow) + (',\n' if i < len(flows) - 1 else '\n')).encode())
+            f.write(b']}\n')
+
+        if self.__spill is not None:
+            self.__spill.close()
+            self.__spill = None
+
+        return f.file_hash
+
+    def __spill_offsets(self):
+        if self.__spill is None:
+            self.__spill = tempfile.TemporaryFile()
+        for flow in self.flows.values():
+            if flow['offsets']:
+                flow['chunks'].append((self.__spill.tell(), len(flow['offsets'])))
+                flow['files'].tofile(self.__spill)
+                flow['offsets'].tofile(self.__spill)
+                flow['files'], flow['offsets'] = array.array('I'), array.array('Q')
+        self.__entries = 0
+
+    def __flow_offsets(self, flow):
+        # (file indexes, offsets) of the chunks moved to the spill file, then of the packets still in memory
+        for position, count in flow['chunks']:
+            files, offsets = array.array('I'), array.array('Q')
+            self.__spill.seek(position)
+            files.fromfile(self.__spill, count)
+            offsets.fromfile(self.__spill, count)
+            yield files, offsets
+        yield flow['files'], flow['offsets']
+
+
+def analyze(filenames, *analyzers):
+    # a single pass over the packets of the files feeds all the analyzers (add_file, add)
+    for file_index, filename in enumerate(filenames):
+        for analyzer in analyzers:
+            analyzer.add_file(filename)
+
+        for linktype, offset, timestamp, data, wirelen in read_packets(filename):
+            packet = parse_packet(linktype, data)
+            for analyzer in analyzers:
+                analyzer.add(file_index, offset, timestamp, wirelen, packet)
@@ -83,9 +83,14 @@ class ReportText:
             'hashd': "File contenente gli hash dei file",
             'logd': "Informazioni generate dai vari componenti del sistema",
             'pcapd': "Registrazione del traffico di rete",
+            'flowsd': "Indice delle connessioni presenti nella registrazione del traffico di rete",
+            'trafficd': "Riepilogo del traffico di rete",
+            'httpd': "Indice delle comunicazioni HTTP decifrate mediante le chiavi SSL, i contenuti sono salvati "
+                     "nella cartella acquisition_http con il nome dato dal relativo hash SHA-256",
             'zipd': "Archivio contenente l'acquisizione",
             'whoisd': "File whois",
             'pngd': "Screenshot della pagina",
+            'pdfd': "Copia vettoriale (PDF) della pagina",
             'waczd': "Archivio WACZ dell'acquisizione",
             'dumpd': "File di analisi del traffico",
             'headersd': "Headers della richiesta",
@@ -104,6 +109,32 @@ class ReportText:
             't7descr': "Tutti i file prodotti dall'utente durante l'acquisizione sono raccolti all'interno "
                        "della cartella compressa avente estensione .zip. Per ognuno di questi file viene riportata "
                        "la dimensione espressa in bytes.",
+            'tnet': "Traffico di rete",
+            'tnetdescr': "Al termine dell'acquisizione, la registrazione del traffico di rete è stata analizzata "
+                         "dal sistema. Di seguito vengono riportati il volume complessivo del traffico, i protocolli "
+                         "utilizzati, gli host con cui sono stati scambiati più dati, le richieste DNS con le relative "
+                         "risposte e i nomi dei server contattati mediante connessioni cifrate TLS.",
+            'tnetna': "Il riepilogo del traffico di rete non è stato prodotto.",
+            'tnetapproximate': "Il numero di valori distinti ha superato il limite del riepilogo: i conteggi "
+                               "dei valori meno frequenti possono essere inferiori a quelli reali. "
+                               "I dati completi sono presenti nella registrazione del traffico di rete.",
+            'tnetvolume': "Volume complessivo",
+            'tnetfirst': "Primo pacchetto",
+            'tnetlast': "Ultimo pacchetto",
+            'tnetprotocols': "Protocolli",
+            'tnetprotocol': "Protocollo",
+            'tnetother': "Altro (non IP)",
+            'tnethosts': "Host principali",
+            'tnetaddress': "Indirizzo",
+            'tnetnames': "Nomi (DNS)",
+            'tnetdns': "Richieste DNS",
+            'tnetname': "Nome",
+            'tnetqueries': "Richieste",
+            'tnetanswers': "Risposte",
+            'tnettls': "Server TLS (SNI)",
+            'tnetconnections': "Connessioni",
+            'packets': "Pacchetti",
+            'bytes': "Byte",
             't8': "Screenshot della pagina",
             't8descr': "Viene di seguito riportato lo screenshot della pagina navigata durante l'acquisizione.",
             'verifi_ok': "La verifica del timestamp del report in formato PDF ha fornito esito positivo. "
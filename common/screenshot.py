@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+import struct
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from common.hashing import HashingWriter
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_FILTER_UP = 2
+
+# a fixed header (or footer) can cover at most 1/4 of the viewport
+MAX_FIXED_REGION = 4
+# candidate shifts compared when looking for the overlap of two strips
+MAX_SHIFT_CANDIDATES = 64
+
+
+class PngWriter():
+    # Encode an RGB PNG a few rows at a time, the whole image is never held in memory
+    def __init__(self, file, width, height, compress_level=6):
+        self.file = file
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self.__compressor = zlib.compressobj(compress_level)
+        self.__previous = np.zeros((1, width, 3), np.uint8)
+
+        self.file.write(PNG_SIGNATURE)
+        # 8 bit depth, truecolor, deflate, adaptive filtering, no interlace
+        self.__write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def write(self, rows):
+        rows = np.ascontiguousarray(rows, dtype=np.uint8)
+        if rows.ndim != 3 or rows.shape[1:] != (self.width, 3):
+            raise ValueError('rows must have shape (n, {}, 3)'.format(self.width))
+        if self.rows + len(rows) > self.height:
+            raise ValueError('too many rows for a {} pixel high image'.format(self.height))
+
+        # "Up" filter: every row is stored as its difference from the row above
+        scanlines = np.empty((len(rows), self.width * 3 + 1), np.uint8)
+        scanlines[:, 0] = PNG_FILTER_UP
+        scanlines[:, 1:] = (rows - np.concatenate((self.__previous, rows[:-1]))).reshape(len(rows), -1)
+
+        self.__previous = rows[-1:].copy()
+        self.rows += len(rows)
+        self.__write_data(self.__compressor.compress(scanlines))
+
+    def close(self):
+        if self.rows != self.height:
+            raise ValueError('{} rows written, {} expected'.format(self.rows, self.height))
+
+        self.__write_data(self.__compressor.flush())
+        self.__write_chunk(b'IEND', b'')
+
+    def __write_data(self, data):
+        if data:
+            self.__write_chunk(b'IDAT', data)
+
+    def __write_chunk(self, chunk_type, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type))))
+
+
+def qimage_to_array(image):
+    # a copy of the pixels of a QImage, whatever the bytes per pixel of its format
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    array = np.frombuffer(bits, np.uint8).reshape(image.height(), image.bytesPerLine())
+
+    return array[:, :image.width() * image.depth() // 8].reshape(image.height(), image.width(), -1).copy()
+
+
+def row_keys(array):
+    # every row becomes a single opaque value, so rows are compared exactly and all at once
+    rows = np.ascontiguousarray(array).reshape(len(array), -1)
+    return rows.view(np.dtype((np.void, rows.shape[1]))).ravel()
+
+
+def find_fixed_regions(previous, current):
+    # rows equal at the top (bottom) of two strips taken at different scroll
+    # positions belong to fixed or sticky headers (footers)
+    equal = row_keys(previous) == row_keys(current)
+    limit = len(equal) // MAX_FIXED_REGION
+
+    def leading(rows):
+        return limit if rows.all() else int(np.argmin(rows))
+
+    return leading(equal[:limit]), leading(equal[::-1][:limit])
+
+
+def find_shift(previous, current, top=0, bottom=0, expected=None):
+    # rows the page moved between two strips, looked for in the scrolling area only
+    a = row_keys(previous)[top:len(previous) - bottom]
+    b = row_keys(current)[top:len(current) - bottom]
+    if expected is None:
+        expected = len(a)
+    if len(a) == 0:
+        return expected
+
+    # the first row of the current strip has to be somewhere in the previous one,
+    # the shift nearest to the expected one wins (e.g. on uniform backgrounds)
+    candidates = np.flatnonzero(a == b[0])
+    candidates = candidates[np.argsort(np.abs(candidates - expected), kind='stable')]
+    for shift in candidates[:MAX_SHIFT_CANDIDATES]:
+        if np.array_equal(a[shift:], b[:len(a) - shift]):
+            return int(shift)
+
+    return expected
+
+
+def stitch_images(filenames, output, leaf_size=None, crops=None):
+    # crops: rows (top, bottom) of every strip already in the previous ones
+    crops = crops or [(0, 0)] * len(filenames)
+
+    # only the headers are read here, to know the size of the final image
+    sizes = []
+    for filename, (top, bottom) in zip(filenames, crops):
+        with Image.open(filename) as image:
+            sizes.append((image.width, image.height - top - bottom))
+
+    width = min(size[0] for size in sizes)
+    heights = [max(0, round(height * width / strip_width)) for strip_width, height in sizes]
+
+    with HashingWriter(output, leaf_size=leaf_size) as f:
+        png = PngWriter(f, width, sum(heights))
+        # one strip at a time is decoded, appended and released
+        for filename, height, (top, bottom) in zip(filenames, heights, crops):
+            if height <= 0:
+                continue
+            with Image.open(filename) as image:
+                strip = image.convert('RGB')
+            if top or bottom:
+                strip = strip.crop((0, top, strip.width, strip.height - bottom))
+            if strip.size != (width, height):
+                strip = strip.resize((width, height))
+            png.write(np.asarray(strip))
+            strip.close()
+        png.close()
+
+    return f.file_hash
@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+import hashlib
+import hmac
+import json
+import os
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from configparser import SafeConfigParser
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+
+from common import http
+from common.hashing import HashingWriter
+from common.pcap import Stream, parse_tcp, read_flow_index, read_packets_at, reassemble
+
+CONTENT_CHANGE_CIPHER_SPEC = 20
+CONTENT_ALERT = 21
+CONTENT_HANDSHAKE = 22
+CONTENT_APPLICATION_DATA = 23
+
+HANDSHAKE_CLIENT_HELLO = 1
+HANDSHAKE_SERVER_HELLO = 2
+HANDSHAKE_ENCRYPTED_EXTENSIONS = 8
+HANDSHAKE_FINISHED = 20
+HANDSHAKE_KEY_UPDATE = 24
+
+EXTENSION_ALPN = 16
+EXTENSION_SUPPORTED_VERSIONS = 43
+
+TLS_1_2 = 0x0303
+TLS_1_3 = 0x0304
+VERSIONS = {0x0301: 'TLS 1.0', 0x0302: 'TLS 1.1', TLS_1_2: 'TLS 1.2', TLS_1_3: 'TLS 1.3'}
+
+# the random of a ServerHello asking the client to send its hello again
+HELLO_RETRY_REQUEST = bytes.fromhex('cf21ad74e59a6111be1d8c021e65b891c2a211167abb8c5e079e09e2c8a8339c')
+
+# (AEAD, key length, implicit IV length, hash) of the AEAD cipher suites, CBC suites can't be decrypted
+CIPHER_SUITES = {
+    0x1301: (AESGCM, 16, 12, 'sha256'),
+    0x1302: (AESGCM, 32, 12, 'sha384'),
+    0x1303: (ChaCha20Poly1305, 32, 12, 'sha256'),
+    0x009c: (AESGCM, 16, 4, 'sha256'),
+    0x009d: (AESGCM, 32, 4, 'sha384'),
+    0x009e: (AESGCM, 16, 4, 'sha256'),
+    0x009f: (AESGCM, 32, 4, 'sha384'),
+    0xc02b: (AESGCM, 16, 4, 'sha256'),
+    0xc02c: (AESGCM, 32, 4, 'sha384'),
+    0xc02f: (AESGCM, 16, 4, 'sha256'),
+    0xc030: (AESGCM, 32, 4, 'sha384'),
+    0xcca8: (ChaCha20Poly1305, 32, 12, 'sha256'),
+    0xcca9: (ChaCha20Poly1305, 32, 12, 'sha256'),
+    0xccaa: (ChaCha20Poly1305, 32, 12, 'sha256'),
+}
+
+# servers whose flows are decrypted even if no server name was seen in the ClientHello
+TLS_PORTS = (443, 8443)
+
+KEY_LOG_FILENAME = 'sslkey.log'
+BROWSER_KEY_LOG_ENVIRONMENT = 'SSLKEYLOGFILE'
+HTTP_INDEX_FILENAME = 'acquisition_http.json'
+HTTP_STORE_DIRECTORY = 'acquisition_http'
+
+# payload bytes of a flow (both directions) read for its decryption, the rest of a longer flow is left encrypted
+MAX_FLOW_SIZE = 64 * 1024 * 1024
+
+STATUS_DECRYPTED = 'decrypted'
+STATUS_NOT_TLS = 'not TLS'
+STATUS_NO_KEYS = 'keys not in the key log'
+STATUS_UNSUPPORTED = 'unsupported cipher suite'
+STATUS_FAILED = 'decryption failed'
+
+
+def enable_browser_key_log(argv):
+    # Chromium reads the key log file only when it starts: the keys of the whole session go to a private file
+    # and each acquisition keeps the keys written while it was running
+    descriptor, filename = tempfile.mkstemp(prefix='fit-', suffix='-' + KEY_LOG_FILENAME)
+    os.close(descriptor)
+    os.environ[BROWSER_KEY_LOG_ENVIRONMENT] = filename
+    return argv + ['--ssl-key-log-file=' + filename]
+
+
+def remove_browser_key_log():
+    filename = os.environ.pop(BROWSER_KEY_LOG_ENVIRONMENT, None)
+    if filename and os.path.isfile(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+
+def browser_key_log_position():
+    filename = os.environ.get(BROWSER_KEY_LOG_ENVIRONMENT)
+    if filename and os.path.isfile(filename):
+        return os.path.getsize(filename)
+    return 0
+
+
+def save_browser_key_log(filename, position=0):
+    # appends the complete lines logged by the browser after position, returns the number of lines
+    source = os.environ.get(BROWSER_KEY_LOG_ENVIRONMENT)
+    if not source or not os.path.isfile(source):
+        return 0
+    with open(source, 'rb') as f:
+        f.seek(position)
+        data = f.read()
+    data = data[:data.rfind(b'\n') + 1]
+    with open(filename, 'ab') as f:
+        f.write(data)
+
+    return data.count(b'\n')
+
+
+def get_decrypt_workers():
+    parser = SafeConfigParser()
+    parser.read('assets/config.ini')
+    workers = parser.getint('fit_properties', 'tls_decrypt_workers', fallback=0)
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+
+    return workers
+
+
+def get_decrypt_max_flow_size():
+    parser = SafeConfigParser()
+    parser.read('assets/config.ini')
+
+    return parser.getint('fit_properties', 'tls_decrypt_max_flow_size', fallback=MAX_FLOW_SIZE)
+
+
+def read_key_log(filename):
+    # {client random: {label: secret}} of a NSS key log file (SSLKEYLOGFILE)
+    keys = {}
+    with open(filename, 'r', errors='replace') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) != 3 or line.startswith('#'):
+                continue
+            label, client_random, secret = fields
+            try:
+                keys.setdefault(bytes.fromhex(client_random), {})[label] = bytes.fromhex(secret)
+            except ValueError:
+                continue
+
+    return keys
+
+
+class Session():
+    def __init__(self):
+        self.version = None
+        self.cipher_suite = None
+        self.client_random = None
+        self.server_random = None
+        self.alpn = None
+        self.status = STATUS_NOT_TLS
+        self.error = None
+        self.client = Stream()
+        self.server = Stream()
+
+    def info(self):
+        return {
+            'version': VERSIONS.get(self.version, self.version and hex(self.version)),
+            'cipher_suite': self.cipher_suite and '0x{:04x}'.format(self.cipher_suite),
+            'client_random': self.client_random and self.client_random.hex(),
+            'alpn': self.alpn,
+            'status': self.status,
+            'error': self.error
+        }
+
+
+def decrypt_session(keys, client, server):
+    # Session with the application data of both directions of a TLS connection, each a Stream
+    session = Session()
+    client_records = list(_records(client.data))
+    server_records = list(_records(server.data))
+    try:
+        for message_type, body in _plain_handshake(client_records):
+            if message_type == HANDSHAKE_CLIENT_HELLO:
+                session.client_random = body[2:34]
+                break
+        for message_type, body in _plain_handshake(server_records):
+            if message_type == HANDSHAKE_SERVER_HELLO and body[2:34] != HELLO_RETRY_REQUEST:
+                _parse_server_hello(session, body)
+                break
+    except (IndexError, struct.error):
+        return session
+    if session.client_random is None or session.server_random is None:
+        return session
+
+    secrets = keys.get(session.client_random)
+    if not secrets:
+        session.status = STATUS_NO_KEYS
+        return session
+    if session.cipher_suite not in CIPHER_SUITES:
+        session.status = STATUS_UNSUPPORTED
+        return session
+
+    try:
+        if session.version == TLS_1_3:
+            session.client = _decrypt_tls13(session, secrets, client, client_records, 'CLIENT')
+            session.server = _decrypt_tls13(session, secrets, server, server_records, 'SERVER')
+        else:
+            client_key, server_key = _tls12_keys(session, secrets)
+            session.client = _decrypt_tls12(session, client_key, client, client_records)
+            session.server = _decrypt_tls12(session, server_key, server, server_records)
+        session.status = STATUS_DECRYPTED
+    except KeyError as e:
+        session.status = STATUS_NO_KEYS
+        session.error = str(e)
+    except Exception as e:
+        session.status = STATUS_FAILED
+        session.error = str(e) or type(e).__name__
+
+    return session
+
+
+def _records(data):
+    # (offset, content type, header, fragment) of the complete records
+    position = 0
+    while position + 5 <= len(data):
+        length = struct.unpack('!H', data[position + 3:position + 5])[0]
+        if position + 5 + length > len(data):
+            return
+        yield position, data[position], data[position:position + 5], data[position + 5:position + 5 + length]
+        position += 5 + length
+
+
+def _plain_handshake(records):
+    # handshake messages sent before the encryption starts
+    data = b''
+    for offset, content_type, header, fragment in records:
+        if content_type != CONTENT_HANDSHAKE:
+            if content_type != CONTENT_CHANGE_CIPHER_SPEC:
+                return
+            continue
+        data += fragment
+        while len(data) >= 4 and len(data) >= 4 + struct.unpack('!I', b'\x00' + data[1:4])[0]:
+            length = struct.unpack('!I', b'\x00' + data[1:4])[0]
+            yield data[0], data[4:4 + length]
+            data = data[4 + length:]
+
+
+def _parse_server_hello(session, body):
+    session.version = struct.unpack('!H', body[:2])[0]
+    session.server_random = body[2:34]
+    position = 35 + body[34]
+    session.cipher_suite = struct.unpack('!H', body[position:position + 2])[0]
+    _parse_extensions(session, body, position + 3)
+
+
+def _parse_extensions(session, body, position):
+    if position + 2 > len(body):
+        return
+
+    end = position + 2 + struct.unpack('!H', body[position:position + 2])[0]
+    position += 2
+    while position + 4 <= end:
+        extension, length = struct.unpack('!HH', body[position:position + 4])
+        value = body[position + 4:position + 4 + length]
+        if extension == EXTENSION_SUPPORTED_VERSIONS:
+            session.version = struct.unpack('!H', value[:2])[0]
+        elif extension == EXTENSION_ALPN:
+            # list length, protocol length, protocol
+            session.alpn = value[3:3 + value[2]].decode('ascii', 'replace')
+        position += 4 + length
+
+
+def _p_hash(algorithm, secret, seed, length):
+    result = b''
+    a = seed
+    while len(result) < length:
+        a = hmac.new(secret, a, algorithm).digest()
+        result += hmac.new(secret, a + seed, algorithm).digest()
+
+    return result[:length]
+
+
+def _expand_label(algorithm, secret, label, length):
+    # HKDF-Expand-Label of TLS 1.3 with an empty context
+    label = b'tls13 ' + label
+    info = struct.pack('!HB', length, len(label)) + label + b'\x00'
+    result = block = b''
+    counter = 1
+    while len(result) < length:
+        block = hmac.new(secret, block + info + bytes([counter]), algorithm).digest()
+        result += block
+        counter += 1
+
+    return result[:length]
+
+
+class _RecordDecrypter():
+    def __init__(self, version, cipher_suite, key, iv):
+        self.aead = CIPHER_SUITES[cipher_suite][0](key)
+        self.iv = iv
+        self.sequence = 0
+        self.version = version
+
+    def decrypt(self, header, fragment):
+        sequence = struct.pack('!Q', self.sequence)
+        if len(self.iv) == 4:
+            # TLS 1.2 GCM: implicit salt and explicit part sent in the record
+            nonce, fragment = self.iv + fragment[:8], fragment[8:]
+        else:
+            nonce = bytes(a ^ b for a, b in zip(self.iv, b'\x00' * (len(self.iv) - 8) + sequence))
+        if self.version == TLS_1_3:
+            aad = header
+        else:
+            aad = sequence + header[:3] + struct.pack('!H', len(fragment) - 16)
+
+        plaintext = self.aead.decrypt(nonce, fragment, aad)
+        self.sequence += 1
+        return plaintext
+
+
+def _tls12_keys(session, secrets):
+    aead, key_length, iv_length, algorithm = CIPHER_SUITES[session.cipher_suite]
+    master_secret = secrets['CLIENT_RANDOM']
+    key_block = _p_hash(algorithm, master_secret,
+                        b'key expansion' + session.server_random + session.client_random,
+                        2 * (key_length + iv_length))
+    client_key = key_block[:key_length], key_block[2 * key_length:2 * key_length + iv_length]
+    server_key = key_block[key_length:2 * key_length], key_block[2 * key_length + iv_length:]
+    return client_key, server_key
+
+
+def _decrypt_tls12(session, key, stream, records):
+    decrypter = None
+    data = bytearray()
+    marks = []
+    for offset, content_type, header, fragment in records:
+        if content_type == CONTENT_CHANGE_CIPHER_SPEC:
+            decrypter = _RecordDecrypter(session.version, session.cipher_suite, *key)
+            continue
+        if decrypter is None:
+            continue
+
+        plaintext = decrypter.decrypt(header, fragment)
+        if content_type == CONTENT_APPLICATION_DATA and plaintext:
+            marks.append((len(data), stream.timestamp(offset)))
+            data += plaintext
+        elif content_type == CONTENT_ALERT:
+            break
+
+    return Stream(bytes(data), marks, stream.complete)
+
+
+def _decrypt_tls13(session, secrets, stream, records, side):
+    aead, key_length, iv_length, algorithm = CIPHER_SUITES[session.cipher_suite]
+
+    def decrypter(secret):
+        return _RecordDecrypter(session.version, session.cipher_suite,
+                                _expand_label(algorithm, secret, b'key', key_length),
+                                _expand_label(algorithm, secret, b'iv', iv_length))
+
+    secret = secrets.get(side + '_HANDSHAKE_TRAFFIC_SECRET')
+    handshake = secret is not None
+    if not handshake:
+        # only the application secrets have been logged
+        secret = secrets[side + '_TRAFFIC_SECRET_0']
+    current = decrypter(secret)
+    messages = b''
+    data = bytearray()
+    marks = []
+    for offset, content_type, header, fragment in records:
+        if content_type != CONTENT_APPLICATION_DATA:
+            continue
+
+        try:
+            plaintext = current.decrypt(header, fragment)
+        except Exception:
+            if current.sequence:
+                raise
+            if handshake:
+                # the handshake secrets don't match the records, try the application ones
+                handshake = False
+                secret = secrets[side + '_TRAFFIC_SECRET_0']
+                current = decrypter(secret)
+            try:
+                plaintext = current.decrypt(header, fragment)
+            except Exception:
+                # a handshake record, only the application secrets are in the key log
+                continue
+
+        # the real content type is the last byte that isn't padding
+        plaintext = plaintext.rstrip(b'\x00')
+        content_type, plaintext = plaintext[-1], plaintext[:-1]
+        if content_type == CONTENT_APPLICATION_DATA:
+            if plaintext:
+                marks.append((len(data), stream.timestamp(offset)))
+                data += plaintext
+        elif content_type == CONTENT_HANDSHAKE:
+            messages += plaintext
+            while len(messages) >= 4 and len(messages) >= 4 + struct.unpack('!I', b'\x00' + messages[1:4])[0]:
+                message_type = messages[0]
+                length = struct.unpack('!I', b'\x00' + messages[1:4])[0]
+                body, messages = messages[4:4 + length], messages[4 + length:]
+                if message_type == HANDSHAKE_ENCRYPTED_EXTENSIONS:
+                    # the ALPN of TLS 1.3 isn't in the ServerHello
+                    _parse_extensions(session, body, 0)
+                elif message_type == HANDSHAKE_FINISHED and handshake:
+                    handshake = False
+                    secret = secrets[side + '_TRAFFIC_SECRET_0']
+                    current = decrypter(secret)
+                elif message_type == HANDSHAKE_KEY_UPDATE:
+                    secret = _expand_label(algorithm, secret, b'traffic upd', len(secret))
+                    current = decrypter(secret)
+        elif content_type == CONTENT_ALERT:
+            break
+
+    return Stream(bytes(data), marks, stream.complete)
+
+
+class ContentStore():
+    # files named by the SHA-256 of their content, the same body is saved once whatever the flow
+    def __init__(self, directory, leaf_size=None):
+        self.directory = directory
+        self.leaf_size = leaf_size
+        self.objects = 0
+        self.__lock = threading.Lock()
+        self.__digests = set()
+
+    def add(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        name = digest[:2] + '/' + digest
+        with self.__lock:
+            new = digest not in self.__digests
+            self.__digests.add(digest)
+            self.objects += new
+
+        if new:
+            filename = os.path.join(self.directory, *name.split('/'))
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with HashingWriter(filename, leaf_size=self.leaf_size) as f:
+                f.write(data)
+
+        return {'sha256': digest, 'size': len(data), 'path': os.path.basename(self.directory) + '/' + name}
+
+
+def decrypt_flow(folder, flow, keys, store, max_size=MAX_FLOW_SIZE):
+    # the TLS session of a flow of the index and its HTTP exchanges, the bodies are saved in the store.
+    # The flow is reassembled in memory: only its first max_size bytes (0 = all) are read
+    endpoints = ([], [])
+    missing = False
+    truncated = False
+    size = 0
+    for filename, offsets in flow['offsets'].items():
+        filename = os.path.join(folder, filename)
+        if not os.path.isfile(filename):
+            # removed by the disk budget of the capture
+            missing = True
+            continue
+        for linktype, offset, timestamp, data, wirelen in read_packets_at(filename, offsets):
+            segment = parse_tcp(linktype, data)
+            if segment is not None:
+                source, source_port, destination, destination_port, sequence, flags, payload = segment
+                if max_size and size + len(payload) > max_size:
+                    truncated = True
+                    break
+                size += len(payload)
+                is_client = (source, source_port) == (flow['client'], flow['client_port'])
+                endpoints[0 if is_client else 1].append((sequence, flags, payload, timestamp))
+        if truncated:
+            break
+
+    client, server = reassemble(endpoints[0]), reassemble(endpoints[1])
+    if server.data[:1] == bytes([CONTENT_HANDSHAKE]) and server.data[5:6] == bytes([HANDSHAKE_CLIENT_HELLO]):
+        # the index took the server for the client (e.g. both ports are high)
+        client, server = server, client
+
+    session = decrypt_session(keys, client, server)
+    result = {key: flow[key] for key in ('client', 'client_port', 'server', 'server_port', 'sni', 'first', 'last')}
+    result.update(session.info())
+    result['complete'] = client.complete and server.complete and not missing and not truncated
+    result['truncated'] = truncated
+    result['exchanges'] = []
+    if session.status != STATUS_DECRYPTED:
+        return result
+
+    try:
+        exchanges = http.exchanges(session.client, session.server)
+    except Exception as e:
+        # the session is kept in the index, the plaintext can't be read as HTTP
+        result['error'] = 'HTTP: ' + (str(e) or type(e).__name__)
+        return result
+
+    for exchange in exchanges:
+        for side in ('request', 'response'):
+            body, encoding = http.decode_body(bytes(exchange[side + '_body']), exchange[side + '_headers'])
+            exchange[side + '_body'] = store.add(body) if body else None
+            if encoding is not None:
+                # the saved body has been decoded, the bytes sent are in the pcap
+                exchange[side + '_body']['content_encoding'] = encoding
+        result['exchanges'].append(exchange)
+
+    return result
+
+
+def decrypt_capture(folder, flows_filename, key_log, output, store_directory, workers=None, progress=None,
+                    leaf_size=None, max_flow_size=None):
+    # the TLS flows of the index are decrypted in a pool of threads, at most workers * 2 flows
+    # of max_flow_size bytes are in memory at a time
+    keys = read_key_log(key_log)
+    store = ContentStore(store_directory, leaf_size)
+    workers = workers or get_decrypt_workers()
+    max_flow_size = get_decrypt_max_flow_size() if max_flow_size is None else max_flow_size
+
+    def is_tls(flow):
+        return flow['protocol'] == 'tcp' and (flow['sni'] is not None or flow['server_port'] in TLS_PORTS)
+
+    total = sum(1 for flow in read_flow_index(flows_filename) if is_tls(flow))
+    sessions = []
+
+    def collect(futures):
+        for future in futures:
+            sessions.append(future.result())
+            if progress is not None:
+                progress(len(sessions), total)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for flow in read_flow_index(flows_filename):
+            if not is_tls(flow):
+                continue
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(decrypt_flow, folder, flow, keys, store, max_flow_size))
+        collect(wait(pending)[0])
+
+    sessions.sort(key=lambda session: session['first'])
+    with HashingWriter(output, leaf_size=leaf_size) as f:
+        f.write(('{"key_log": ' + json.dumps(os.path.basename(key_log)) + ', "sessions": [\n').encode())
+        for i, session in enumerate(sessions):
+            f.write((json.dumps(session) + (',\n' if i < len(sessions) - 1 else '\n')).encode())
+        f.write(b']}\n')
+
+    return {
+        'sessions': len(sessions),
+        'decrypted': sum(1 for session in sessions if session['status'] == STATUS_DECRYPTED),
+        'exchanges': sum(len(session['exchanges']) for session in sessions),
+        'objects': store.objects
+    }
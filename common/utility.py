@@ -11,7 +11,6 @@ from importlib import util
 import distutils.spawn
 import os
 import sys
-import hashlib
 import ntplib
 
 import urllib.request
@@ -75,14 +74,6 @@ def get_npcap_installer_url():
             raise Exception(e)
         
 
-def calculate_hash(filename, algorithm):
-    with open(filename, "rb") as f:
-        file_hash = hashlib.new(algorithm)
-        while chunk := f.read(8192):
-            file_hash.update(chunk)
-
-        return file_hash.hexdigest()
-
 def get_ntp_date_and_time(server):
     try:
         ntpDate = None
@@ -202,6 +193,14 @@ def import_modules(start_path, start_module_name = ""):
 def screenshot_filename(path, basename, extention = '.png'):
     return os.path.join(path, basename + '_' +datetime.now().strftime('%Y-%m-%d_%H-%M-%S.%f') + extention)
 
+def format_size(size):
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if abs(size) < 1024 or unit == 'GiB':
+            break
+        size /= 1024
+
+    return '{:.0f} {}'.format(size, unit) if unit == 'B' else '{:.1f} {}'.format(size, unit)
+
 def is_cmd(name):
   return distutils.spawn.find_executable(name) is not None
 
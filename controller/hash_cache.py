@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+import os
+import threading
+
+from model.hash_cache import HashCache as HashCacheModel
+
+from common.hashing import FileHash, DEFAULT_ALGORITHMS
+from common.merkle import MerkleTree, ALGORITHM as LEAF_ALGORITHM
+
+MERKLE_ALGORITHM = 'merkle-{}-{}'
+
+
+class HashCache():
+    def __init__(self):
+        self.model = HashCacheModel()
+        self.__lock = threading.Lock()
+
+    def get(self, filename, algorithms=None, leaf_size=None):
+        algorithms = algorithms or DEFAULT_ALGORITHMS
+        stat = os.stat(filename)
+        key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+        with self.__lock:
+            digests = {algorithm: self.model.get(*key, algorithm) for algorithm in algorithms}
+            leaves = None
+            if leaf_size:
+                leaves = self.model.get(*key, MERKLE_ALGORITHM.format(LEAF_ALGORITHM, leaf_size))
+
+        if None in digests.values() or (leaf_size and leaves is None):
+            return None
+
+        merkle = MerkleTree.from_leaves(leaves.split(','), leaf_size) if leaf_size else None
+
+        return FileHash(filename, stat.st_size, digests, merkle=merkle)
+
+    def store(self, file_hash):
+        stat = os.stat(file_hash.filename)
+        digests = dict(file_hash.digests)
+        if file_hash.merkle is not None:
+            tree = file_hash.merkle.finalize()
+            digests[MERKLE_ALGORITHM.format(tree.algorithm, tree.leaf_size)] = ','.join(tree.leaves)
+
+        with self.__lock:
+            self.model.set(stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, digests)
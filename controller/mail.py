@@ -13,6 +13,8 @@ import email.message
 import re
 import pyzmail
 
+from common.hashing import HashingWriter
+
 class Mail():
     def __init__(self):
         self.email_address = None
@@ -162,5 +164,7 @@ class Mail():
         filename = f"{message.get('message-id')[1:-8]}.eml"
         email_path = os.path.join(folder_dir, filename)
 
-        with open(email_path, 'wb') as f:
-            f.write(message.as_bytes())
\ No newline at end of file
+        with HashingWriter(email_path) as f:
+            f.write(message.as_bytes())
+
+        return f.file_hash
\ No newline at end of file
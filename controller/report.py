@@ -6,7 +6,10 @@
 # SPDX-License-Identifier: GPL-3.0-only
 # -----
 ######  
+import datetime
 import fnmatch
+import html
+import json
 import os
 
 from xhtml2pdf import pisa
@@ -14,16 +17,21 @@ from PyPDF2 import PdfMerger
 import zipfile
 
 from common.report import ReportText
+from common.hashing import LABELS
+from common.pcap import FLOW_INDEX_SUFFIX, TRAFFIC_SUMMARY_SUFFIX
+from common.tls import HTTP_INDEX_FILENAME
 
 
 class Report:
-    def __init__(self, cases_folder_path, case_info):
+    def __init__(self, cases_folder_path, case_info, hashes=None, archives=None):
         self.cases_folder_path = cases_folder_path
         self.output_front = os.path.join(self.cases_folder_path, "front_report.pdf")
         self.output_content = os.path.join(self.cases_folder_path, "content_report.pdf")
         self.output_front_result = open(self.output_front, "w+b")
         self.output_content_result = open(self.output_content, "w+b")
         self.case_info = case_info
+        self.hashes = hashes
+        self.archives = archives
 
     def generate_pdf(self, type, ntp):
 
@@ -74,21 +82,30 @@ class Report:
                 t4=phrases.TEXT['t4'], t4descr=phrases.TEXT['t4descr'],
                 name=phrases.TEXT['name'], descr=phrases.TEXT['descr'],
 
-                avi=acquisition_files[fnmatch.filter(acquisition_files.keys(), '*.avi')[0]], avid=phrases.TEXT['avid'],
+                avi='<br>'.join(sorted(fnmatch.filter(acquisition_files.values(), '*.avi'))) or
+                    acquisition_files['acquisition.avi'], avid=phrases.TEXT['avid'],
                 hash=acquisition_files['acquisition.hash'], hashd=phrases.TEXT['hashd'],
                 log=acquisition_files['acquisition.log'], logd=phrases.TEXT['logd'],
-                pcap=acquisition_files['acquisition.pcap'], pcapd=phrases.TEXT['pcapd'],
+                pcap='<br>'.join(sorted(fnmatch.filter(acquisition_files.values(), '*.pcap'))) or
+                    acquisition_files['acquisition.pcap'], pcapd=phrases.TEXT['pcapd'],
+                flows=acquisition_files['acquisition' + FLOW_INDEX_SUFFIX], flowsd=phrases.TEXT['flowsd'],
+                traffic=acquisition_files['acquisition' + TRAFFIC_SUMMARY_SUFFIX], trafficd=phrases.TEXT['trafficd'],
+                http=acquisition_files[HTTP_INDEX_FILENAME], httpd=phrases.TEXT['httpd'],
                 zip=acquisition_files[fnmatch.filter(acquisition_files.keys(), '*.zip')[0]], zipd=phrases.TEXT['zipd'],
                 whois=acquisition_files['whois.txt'], whoisd=phrases.TEXT['whoisd'],
                 headers=acquisition_files['headers.txt'], headersd=phrases.TEXT['headersd'],
-                nslookup=acquisition_files['nslookup.txt'], nslookupd=phrases.TEXT['pngd'],
+                nslookup=acquisition_files['nslookup.txt'], nslookupd=phrases.TEXT['nslookupd'],
                 cer=acquisition_files['server.cer'], cerd=phrases.TEXT['cerd'],
                 sslkey=acquisition_files['sslkey.log'], sslkeyd=phrases.TEXT['sslkeyd'],
                 traceroute=acquisition_files['traceroute.txt'], tracerouted=phrases.TEXT['tracerouted'],
+                png=acquisition_files['screenshot.png'], pngd=phrases.TEXT['pngd'],
+                pdf=acquisition_files['screenshot.pdf'], pdfd=phrases.TEXT['pdfd'],
 
                 t5=phrases.TEXT['t5'], t5descr=phrases.TEXT['t5descr'], file=user_files,
                 t6=phrases.TEXT['t6'], t6descr=phrases.TEXT['t6descr'], filedata=zip_enum,
                 t7=phrases.TEXT['t7'], t7descr=phrases.TEXT['t7descr'],
+                tnet=phrases.TEXT['tnet'], tnetdescr=phrases.TEXT['tnetdescr'],
+                trafficdata=self._traffic_summary(phrases),
                 titlecc=phrases.TEXT['titlecc'], ccdescr=phrases.TEXT['ccdescr'],
                 titleh=phrases.TEXT['titleh'], hdescr=phrases.TEXT['hdescr']
             )
@@ -166,6 +183,12 @@ class Report:
             acquisition_files['acquisition.log'] = "File non prodotto"
         if not any(value.endswith('.pcap') for value in acquisition_files.values()):
             acquisition_files['acquisition.pcap'] = "File non prodotto"
+        if not 'acquisition' + FLOW_INDEX_SUFFIX in acquisition_files.values():
+            acquisition_files['acquisition' + FLOW_INDEX_SUFFIX] = "File non prodotto"
+        if not 'acquisition' + TRAFFIC_SUMMARY_SUFFIX in acquisition_files.values():
+            acquisition_files['acquisition' + TRAFFIC_SUMMARY_SUFFIX] = "File non prodotto"
+        if not HTTP_INDEX_FILENAME in acquisition_files.values():
+            acquisition_files[HTTP_INDEX_FILENAME] = "File non prodotto"
         if not any(value.endswith('.zip') for value in acquisition_files.values()):
             acquisition_files['acquisition.zip'] = "File non prodotto"
         if not 'whois.txt' in acquisition_files.values():
@@ -180,12 +203,70 @@ class Report:
             acquisition_files['sslkey.log'] = "File non prodotto"
         if not 'traceroute.txt' in acquisition_files.values():
             acquisition_files['traceroute.txt'] = "File non prodotto"
+        if not 'screenshot.png' in acquisition_files.values():
+            acquisition_files['screenshot.png'] = "File non prodotto"
+        if not 'screenshot.pdf' in acquisition_files.values():
+            acquisition_files['screenshot.pdf'] = "File non prodotto"
 
         return acquisition_files
 
+    def _traffic_summary(self, phrases):
+        # tables of the summary written by the packet capture, the pcap is never read here
+        try:
+            with open(os.path.join(self.cases_folder_path, 'acquisition' + TRAFFIC_SUMMARY_SUFFIX), 'r') as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            return '<p>' + phrases.TEXT['tnetna'] + '</p>'
+
+        def table(headers, rows):
+            text = '<table class="traffic_info"><tr>'
+            text += ''.join('<th>' + header + '</th>' for header in headers) + '</tr>'
+            for row in rows:
+                text += '<tr>' + ''.join('<td>' + html.escape(str(value)) + '</td>' for value in row) + '</tr>'
+            return text + '</table>'
+
+        def timestamp(value):
+            if value is None:
+                return 'N/A'
+            return datetime.datetime.utcfromtimestamp(value).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+        packets, size = phrases.TEXT['packets'], phrases.TEXT['bytes']
+        text = '<h3>8.1 ' + phrases.TEXT['tnetvolume'] + '</h3>'
+        text += table([phrases.TEXT['tnetfirst'], phrases.TEXT['tnetlast'], packets, size],
+                      [[timestamp(summary['first']), timestamp(summary['last']), summary['packets'], summary['bytes']]])
+        text += '<h3>8.2 ' + phrases.TEXT['tnetprotocols'] + '</h3>'
+        text += table([phrases.TEXT['tnetprotocol'], packets, size],
+                      [[row['protocol'].upper() if row['protocol'] else phrases.TEXT['tnetother'],
+                        row['packets'], row['bytes']] for row in summary['protocols']])
+        text += '<h3>8.3 ' + phrases.TEXT['tnethosts'] + '</h3>'
+        text += table([phrases.TEXT['tnetaddress'], phrases.TEXT['tnetnames'], packets, size],
+                      [[row['address'], ', '.join(row['names']), row['packets'], row['bytes']]
+                       for row in summary['hosts']])
+        text += '<h3>8.4 ' + phrases.TEXT['tnetdns'] + '</h3>'
+        text += table([phrases.TEXT['tnetname'], phrases.TEXT['tnetqueries'], phrases.TEXT['tnetanswers']],
+                      [[row['name'], row['queries'], ', '.join(row['answers'])] for row in summary['dns']])
+        text += '<h3>8.5 ' + phrases.TEXT['tnettls'] + '</h3>'
+        text += table([phrases.TEXT['tnetname'], phrases.TEXT['tnetconnections']],
+                      [[row['server_name'], row['connections']] for row in summary['tls']])
+        if summary['approximate']:
+            text += '<p>' + phrases.TEXT['tnetapproximate'] + '</p>'
+
+        return text
+
     def _zip_files_enum(self):
         zip_enum = ''
         zip_dir = ''
+        if self.archives:
+            for archive, members in self.archives.items():
+                for member in members:
+                    if member.size > 0:
+                        zip_enum += '<p>' + archive + '/' + member.name + "</p>"
+                        zip_enum += '<p>Dimensione: ' + str(member.size) + " bytes</p>"
+                        for algorithm, digest in member.digests.items():
+                            zip_enum += '<p>' + LABELS.get(algorithm, algorithm.upper()) + ': ' + digest + "</p>"
+                        zip_enum += '<hr>'
+            return zip_enum
+
         # getting zip folder and passing file names and dimensions to the template
         for fname in os.listdir(self.cases_folder_path):
             if fname.endswith('.zip'):
@@ -206,8 +287,17 @@ class Report:
         return zip_enum
 
     def __hash_reader(self):
+        # the hash log also has the hashes logged while the files were written (e.g. the EML files, zipped
+        # before the post acquisition), the hashes calculated are logged to it before the report is generated
         hash_text = ''
-        with open(os.path.join(self.cases_folder_path, 'acquisition.hash'), "r", encoding='utf-8') as f:
-            for line in f:
+        filename = os.path.join(self.cases_folder_path, 'acquisition.hash')
+        if os.path.isfile(filename):
+            with open(filename, "r", encoding='utf-8') as f:
+                for line in f:
+                    hash_text += '<p>' + line + "</p>"
+            return hash_text
+
+        for file_hash in self.hashes or []:
+            for line in file_hash.lines():
                 hash_text += '<p>' + line + "</p>"
         return hash_text
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+import html
+import json
+import os
+from datetime import datetime, timezone
+
+from xhtml2pdf import pisa
+
+from common.hashing import (calculate_hashes_parallel, calculate_zip_member_hashes, is_hash_cache_enabled,
+                            read_hash_log)
+from common.merkle import MANIFEST_FILENAME, read_manifest, verify_manifest
+from common.constants.controller.verify_acquisition import *
+from common.report import ReportText
+
+from controller.hash_cache import HashCache as HashCacheController
+
+
+class VerifyAcquisition():
+    def __init__(self, folder, workers=None, force=True):
+        self.folder = folder
+        self.workers = workers
+        # a formal verification always reads every byte again unless asked otherwise
+        self.force = force
+        self.result = None
+
+    def verify(self):
+        # a folder that can't be verified fails with the reason, the other folders of a batch go on
+        error = None
+        try:
+            files = self.__verify_files()
+        except Exception as e:
+            files, error = [], str(e) or e.__class__.__name__
+
+        self.result = {
+            'folder': os.path.abspath(self.folder),
+            'verified_at': datetime.now(timezone.utc).astimezone().isoformat(),
+            'result': PASS if error is None and files and all(file['status'] == PASS for file in files) else FAIL,
+            'error': error,
+            'files': files
+        }
+
+        return self.result
+
+    def __verify_files(self):
+        entries = read_hash_log(os.path.join(self.folder, 'acquisition.hash'))
+        if not entries:
+            raise ValueError(NO_ENTRIES)
+        algorithms = sorted({algorithm for entry in entries for algorithm in entry['digests']})
+
+        on_disk = [entry for entry in entries if os.path.isfile(os.path.join(self.folder, entry['name']))]
+        cache = HashCacheController() if is_hash_cache_enabled() and not self.force else None
+        hashes = calculate_hashes_parallel([os.path.join(self.folder, entry['name']) for entry in on_disk],
+                                           algorithms, self.workers, cache=cache, force=self.force)
+        actual = {entry['name']: file_hash for entry, file_hash in zip(on_disk, hashes)}
+
+        # entries hashed before being zipped (e.g. EML files) are checked inside the archives
+        if len(on_disk) < len(entries):
+            for archive in [f.path for f in os.scandir(self.folder) if f.is_file() and f.name.endswith('.zip')]:
+                for member in calculate_zip_member_hashes(archive, algorithms, self.workers):
+                    actual.setdefault(member.name, member)
+
+        files = []
+        for entry in entries:
+            file_hash = actual.get(entry['name'])
+            if file_hash is None:
+                status = MISSING
+            elif file_hash.size == entry['size'] and \
+                    all(file_hash.digests.get(algorithm) == digest for algorithm, digest in entry['digests'].items()):
+                status = PASS
+            else:
+                status = FAIL
+
+            files.append({
+                'name': entry['name'],
+                'status': status,
+                'expected': dict({'size': entry['size']}, **entry['digests']),
+                'actual': dict({'size': file_hash.size}, **file_hash.digests) if file_hash else None
+            })
+
+        self.__locate_alterations(files)
+
+        return files
+
+    def __locate_alterations(self, files):
+        # the altered chunks are located with the Merkle manifest, only if the manifest itself is unaltered
+        altered = [file for file in files if file['status'] == FAIL]
+        if not altered or not any(file['name'] == MANIFEST_FILENAME and file['status'] == PASS for file in files):
+            return
+
+        manifest = read_manifest(os.path.join(self.folder, MANIFEST_FILENAME))
+        manifest['files'] = {file['name']: manifest['files'][file['name']] for file in altered
+                             if file['name'] in manifest['files']}
+        results = verify_manifest(self.folder, manifest, workers=self.workers)
+        for file in altered:
+            if file['name'] in results:
+                file['altered_regions'] = results[file['name']]['regions']
+
+    def write_json(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.result, f, indent=1)
+
+    def generate_pdf(self, filename):
+        phrases = ReportText()
+        files = ''
+        for file in self.result['files']:
+            result = REPORT_RESULT[file['status']]
+            if file.get('altered_regions'):
+                result += ' (' + REPORT_ALTERED_REGIONS.format(
+                    ', '.join('{}-{}'.format(start, end - 1) for start, end in file['altered_regions'])) + ')'
+            files += '<tr><td>' + html.escape(file['name']) + '</td><td>' + str(file['expected']['size']) + '</td><td>' + \
+                     result + '</td></tr>'
+
+        content_index_path = os.path.join("assets", "templates", "template_verify_acquisition.html")
+        content_index = open(content_index_path).read().format(
+            title=phrases.TEXT['title'],
+            t1=REPORT_TITLE, t1descr=REPORT_DESCRIPTION,
+            folder_label=REPORT_LABEL_FOLDER, folder=html.escape(self.result['folder']),
+            date=REPORT_LABEL_DATE, verified_at=self.result['verified_at'],
+            result_label=REPORT_LABEL_RESULT, result=REPORT_RESULT[self.result['result']],
+            error='' if self.result.get('error') is None else
+            '<tr><td>' + REPORT_LABEL_ERROR + '</td><td>' + html.escape(self.result['error']) + '</td></tr>',
+            t2=REPORT_FILES,
+            name=REPORT_LABEL_NAME, size=REPORT_LABEL_SIZE,
+            files=files
+        )
+
+        with open(filename, "w+b") as f:
+            pisa.CreatePDF(content_index, dest=f)
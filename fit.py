@@ -6,22 +6,80 @@
 # SPDX-License-Identifier: GPL-3.0-only
 # -----
 ######  
+import argparse
+import os
 import sys
-from PyQt6.QtWidgets import QApplication
 
-from view.init import Init as InitView
-from view.wizard import Wizard as WizardView
-from view.web.web import Web as WebView
-from view.mail import Mail as MailView
-from view.instagram import Instagram as InstagramView
+from controller.verify_acquisition import VerifyAcquisition as VerifyAcquisitionController
+from common.constants.controller import verify_acquisition
+
+
+def verify_acquisition_command(argv):
+    parser = argparse.ArgumentParser(prog='fit.py verify-acquisition',
+                                     description='Verify acquisition folders against their acquisition.hash')
+    parser.add_argument('folders', nargs='+', metavar='dir')
+    parser.add_argument('--workers', type=int, default=None, help='number of files hashed at the same time')
+    parser.add_argument('--output', required=True,
+                        help='directory for the JSON and PDF summaries, outside the acquisition folders')
+    parser.add_argument('--use-cache', action='store_true', help='trust the digest cache for unchanged files')
+    args = parser.parse_args(argv)
+
+    # the summaries are never written into the evidence being verified
+    output_root = os.path.abspath(args.output)
+    for folder in args.folders:
+        folder = os.path.abspath(folder)
+        try:
+            inside = os.path.commonpath([folder, output_root]) == folder
+        except ValueError:
+            # different drives
+            inside = False
+        if inside:
+            parser.error('the output directory {} is inside the acquisition folder {}'.format(args.output, folder))
+
+    exit_code = 0
+    for folder in args.folders:
+        verification = VerifyAcquisitionController(folder, args.workers, force=not args.use_cache)
+        result = verification.verify()
+
+        output = os.path.join(output_root, os.path.basename(os.path.normpath(folder)))
+        try:
+            if not os.path.isdir(output):
+                os.makedirs(output)
+            verification.write_json(os.path.join(output, verify_acquisition.JSON_FILENAME))
+            verification.generate_pdf(os.path.join(output, verify_acquisition.PDF_FILENAME))
+        except Exception as e:
+            result = dict(result, result=verify_acquisition.FAIL, error=str(e))
+
+        print('{}: {}'.format(result['result'].upper(), folder))
+        if result['error'] is not None:
+            print('    {}'.format(result['error']), file=sys.stderr)
+        if result['result'] != verify_acquisition.PASS:
+            exit_code = 1
+
+    return exit_code
 
-from view.verify_pec import VerifyPec as VerifyPecView
 
-from view.verify_pdf_timestamp import VerifyPDFTimestamp as VerifyPDFTimestampView
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'verify-acquisition':
+        sys.exit(verify_acquisition_command(sys.argv[2:]))
 
+    # the command line verification runs without Qt, the GUI is imported only here
+    from PyQt6.QtWidgets import QApplication
 
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    from view.init import Init as InitView
+    from view.wizard import Wizard as WizardView
+    from view.web.web import Web as WebView
+    from view.mail import Mail as MailView
+    from view.instagram import Instagram as InstagramView
+
+    from view.verify_pec import VerifyPec as VerifyPecView
+
+    from view.verify_pdf_timestamp import VerifyPDFTimestamp as VerifyPDFTimestampView
+
+    from common.tls import enable_browser_key_log, remove_browser_key_log
+
+    # the browser logs its TLS keys only if the file is given before it starts
+    app = QApplication(enable_browser_key_log(sys.argv))
 
     init = InitView()
 
@@ -66,4 +124,6 @@ if __name__ == '__main__':
     
     init.init_check()
     wizard.show()
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    remove_browser_key_log()
+    sys.exit(exit_code)
@@ -21,11 +21,19 @@ class PacketCapture(Base):
     id = Column(Integer, primary_key = True)
     enabled = Column(Boolean)
     filename = Column(String)
+    rotation_size = Column(Integer, default=0)
+    rotation_duration = Column(Integer, default=0)
+    snaplen = Column(Integer, default=0)
+    disk_budget = Column(Integer, default=0)
+    interface = Column(String, default="")
+    bpf_filter = Column(String, default="")
+    auto_filter = Column(Boolean, default=False)
     
     def __init__(self) -> None:
         super().__init__()
         self.db = Db()
         self.metadata.create_all(self.db.engine)
+        self.db.upgrade_table(self.__table__)
     
     def get(self):
         if self.db.session.query(PacketCapture).first() is None:
@@ -41,6 +49,18 @@ class PacketCapture(Base):
         
         self.enabled = True
         self.filename = "acquisition.pcap"
+        # a new file is started every rotation_size MiB or rotation_duration seconds, 0 disables the limit
+        self.rotation_size = 0
+        self.rotation_duration = 0
+        # bytes saved for every packet, 0 saves the whole packet
+        self.snaplen = 0
+        # MiB the rotated files can take, the oldest ones are removed beyond it, 0 disables the limit
+        self.disk_budget = 0
+        # empty: the default interface of the system
+        self.interface = ""
+        self.bpf_filter = ""
+        # capture only DNS and the hosts requested by the browser during the acquisition
+        self.auto_filter = False
         
         self.db.session.add(self)
         self.db.session.commit()
\ No newline at end of file
@@ -23,11 +23,19 @@ class ScreenRecorder(Base):
     codec_id = Column(Integer)
     fps = Column(Integer)
     filename = Column(String)
+    variable_frame_rate = Column(Boolean, default=False)
+    segment_duration = Column(Integer, default=600)
+    segment_size = Column(Integer, default=0)
+    region = Column(String, default="monitor")
+    monitor = Column(Integer, default=0)
+    rectangle = Column(String, default="")
+    scale = Column(Integer, default=1)
     
     def __init__(self) -> None:
         super().__init__()
         self.db = Db()
         self.metadata.create_all(self.db.engine)
+        self.db.upgrade_table(self.__table__)
     
     def get(self):
         if self.db.session.query(ScreenRecorder).first() is None:
@@ -45,6 +53,16 @@ class ScreenRecorder(Base):
         self.codec_id = 1
         self.fps = 25
         self.filename = "acquisition.avi"
+        self.variable_frame_rate = False
+        # a new file every segment_duration seconds or segment_size MiB, 0 disables the limit
+        self.segment_duration = 600
+        self.segment_size = 0
+        # monitor (index in the list of monitors), window (the FIT window) or rectangle ("x,y,width,height")
+        self.region = "monitor"
+        self.monitor = 0
+        self.rectangle = ""
+        # the video is downscaled by this factor
+        self.scale = 1
         
         self.db.session.add(self)
         self.db.session.commit()
\ No newline at end of file
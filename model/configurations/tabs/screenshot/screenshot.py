@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+from model.db import Db
+
+from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base()
+
+
+class Screenshot(Base):
+    __tablename__ = 'configuration_screenshot'
+
+    id = Column(Integer, primary_key=True)
+    wait_timeout = Column(Integer)
+    capture_mode = Column(String)
+    tile_height = Column(Integer)
+    print_pdf = Column(Boolean)
+    pdf_layout = Column(String)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.db = Db()
+        self.metadata.create_all(self.db.engine)
+
+    def get(self):
+        if self.db.session.query(Screenshot).first() is None:
+            self.set_default_values()
+
+        return self.db.session.query(Screenshot).all()
+
+    def update(self, options):
+        self.db.session.query(Screenshot).filter(Screenshot.id == options.get('id')).update(options)
+        self.db.session.commit()
+
+    def set_default_values(self):
+        # upper bound (ms) to wait for the page to be ready after each scroll
+        self.wait_timeout = 3000
+        # scroll: scroll the visible browser and grab every viewport
+        # offscreen: render the page in a hidden view as high as the page (or a tile)
+        self.capture_mode = "scroll"
+        self.tile_height = 4096
+        # vector copy of the page printed to PDF at the end of the acquisition
+        self.print_pdf = True
+        self.pdf_layout = "paginated"
+
+        self.db.session.add(self)
+        self.db.session.commit()
@@ -7,7 +7,7 @@
 # -----
 ######  
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 
 class Db():
@@ -24,3 +24,25 @@ class Db():
     @property
     def session(self):
         return self._session
+
+    def upgrade_table(self, table):
+        # create_all never alters an existing table: the columns added by newer versions
+        # are added here with the default of the model, before the first query
+        existing = {column['name'] for column in inspect(self._engine).get_columns(table.name)}
+        with self._engine.begin() as connection:
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                statement = 'ALTER TABLE {} ADD COLUMN {} {}'.format(
+                    table.name, column.name, column.type.compile(dialect=self._engine.dialect))
+                if column.default is not None and not callable(column.default.arg):
+                    statement += ' DEFAULT ' + _literal(column.default.arg)
+                connection.execute(text(statement))
+
+
+def _literal(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+from model.db import Db
+
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.declarative import declarative_base
+Base = declarative_base()
+
+
+class HashCache(Base):
+
+    __tablename__ = 'hash_cache'
+
+    device = Column(Integer, primary_key = True)
+    inode = Column(Integer, primary_key = True)
+    algorithm = Column(String, primary_key = True)
+    size = Column(Integer)
+    mtime_ns = Column(Integer)
+    digest = Column(String)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.db = Db()
+        self.metadata.create_all(self.db.engine)
+
+    def get(self, device, inode, size, mtime_ns, algorithm):
+        row = self.db.session.query(HashCache).filter(HashCache.device == device,
+                                                      HashCache.inode == inode,
+                                                      HashCache.algorithm == algorithm).first()
+        # a different size or mtime means the file changed, the entry is stale
+        if row is None or row.size != size or row.mtime_ns != mtime_ns:
+            return None
+
+        return row.digest
+
+    def set(self, device, inode, size, mtime_ns, digests):
+        for algorithm, digest in digests.items():
+            values = {'device': device, 'inode': inode, 'algorithm': algorithm,
+                      'size': size, 'mtime_ns': mtime_ns, 'digest': digest}
+            statement = insert(HashCache).values(values).on_conflict_do_update(
+                index_elements=['device', 'inode', 'algorithm'],
+                set_={'size': size, 'mtime_ns': mtime_ns, 'digest': digest})
+            self.db.session.execute(statement)
+
+        self.db.session.commit()
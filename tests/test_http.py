@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+import unittest
+from unittest import mock
+
+from common.http import HPackDecoder, HPackZString
+
+# RFC 7541 C.4.1: first request with Huffman coding, :authority is a literal with incremental indexing
+HUFFMAN_REQUEST = bytes.fromhex('828684418cf1e3c2e5f23a6ba0ab90f4ff')
+HUFFMAN_REQUEST_HEADERS = [(':method', 'GET'), (':scheme', 'http'), (':path', '/'),
+                           (':authority', 'www.example.com')]
+
+
+class HPackDecoderTest(unittest.TestCase):
+
+    def test_huffman_literal(self):
+        decoder = HPackDecoder()
+        self.assertEqual(decoder.decode(HUFFMAN_REQUEST), HUFFMAN_REQUEST_HEADERS)
+        # the literal is in the dynamic table for the next blocks
+        self.assertEqual(decoder.decode(bytes.fromhex('be')), [(':authority', 'www.example.com')])
+
+    def test_huffman_literal_decoded_as_str(self):
+        # scapy >= 2.6 returns str instead of bytes
+        huffman_decode = HPackZString.huffman_decode
+
+        def decode_to_str(*args):
+            value = huffman_decode(*args)
+            return value.decode() if isinstance(value, bytes) else value
+
+        with mock.patch.object(HPackZString, 'huffman_decode', side_effect=decode_to_str):
+            self.assertEqual(HPackDecoder().decode(HUFFMAN_REQUEST), HUFFMAN_REQUEST_HEADERS)
+
+
+if __name__ == '__main__':
+    unittest.main()
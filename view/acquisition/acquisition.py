@@ -25,6 +25,8 @@ from controller.configurations.tabs.screenrecorder.screenrecorder import ScreenR
 from controller.configurations.tabs.general.network import Network as NetworkController
 
 from common.utility import is_npcap_installed, get_platform
+from common.tls import browser_key_log_position
+from common.constants.view.screenrecorder import REGION_WINDOW
 
 from PyQt6.QtCore import pyqtSignal
 
@@ -37,6 +39,7 @@ class Acquisition(Base):
 
         self.folder = None
         self.case_info = None
+        self.key_log_position = 0
         self.post_acquisition = PostAcquisition(self)
         self.post_acquisition_method_list = [x for x, y in PostAcquisition.__dict__.items() if not x.startswith("__") and type(y) == FunctionType]
         
@@ -62,6 +65,7 @@ class Acquisition(Base):
 
         self.folder = folder
         self.case_info = case_info
+        self.key_log_position = browser_key_log_position()
 
         self.log_confing.change_filehandlers_path(self.folder)
         logging.config.dictConfig(self.log_confing.config)
@@ -91,6 +95,12 @@ class Acquisition(Base):
         if Tasks.SCREEN_RECORDER in tasks:
             options = ScreenRecorderController().options
             options['filename'] = os.path.join(self.folder, options['filename'])
+            if options.get('region') == REGION_WINDOW and self.parent() is not None:
+                # the FIT window as it is when the recording starts, in physical pixels
+                ratio = self.parent().screen().devicePixelRatio()
+                geometry = self.parent().frameGeometry()
+                options['window'] = tuple(round(value * ratio) for value in
+                                          (geometry.x(), geometry.y(), geometry.width(), geometry.height()))
             screenrecorder = AcquisitionScreenRecorder(Tasks.SCREEN_RECORDER, State.STARTED, Status.PENDING, self)
             self.add_task(screenrecorder)
             screenrecorder.start(options)
@@ -171,6 +181,11 @@ class Acquisition(Base):
                 task[0].stop()
     
       
+    def add_capture_host(self, host):
+        task = self.get_task(Tasks.PACKET_CAPTURE)
+        if task and host:
+            task[0].add_host(host)
+
     def task_is_completed(self, options):
         
         name = None
@@ -77,6 +77,11 @@ class Base(QObject):
         if row >= 0:
             self.info.update_task(row, task_state, task_status, details)
     
+    def update_task_metrics(self, task_name, metrics):
+        row = self.info.get_row(task_name)
+        if row is not None:
+            self.info.update_task_metrics(row, metrics)
+
     def check_if_all_tasks_have_same_state(self, state_to_check):
         
         same_state = False
@@ -27,15 +27,16 @@ class AcquisitionInfo(QtWidgets.QDialog):
 
         self.table = QtWidgets.QTableWidget(self)
 
-        self.table.resize(500, 400)
+        self.resize(800, 400)
+        self.table.resize(800, 400)
       
-        self.table.setColumnCount(3)
-        self.table.setColumnWidth(0, 250)
+        self.table.setColumnCount(4)
+        self.table.setColumnWidth(0, 200)
 
 
 
         # Set the table headers
-        self.table.setHorizontalHeaderLabels(["Task", "State", "Status"])
+        self.table.setHorizontalHeaderLabels(["Task", "State", "Status", "Metrics"])
         self.table.horizontalHeader().setStretchLastSection(True)
 
     def add_task(self, task, state, status, details=""):
@@ -50,6 +51,7 @@ class AcquisitionInfo(QtWidgets.QDialog):
         self.table.setItem(row, 0, QtWidgets.QTableWidgetItem(task))
         self.table.setItem(row, 1, QtWidgets.QTableWidgetItem(state))
         self.table.setItem(row, 2, status)
+        self.table.setItem(row, 3, QtWidgets.QTableWidgetItem(""))
         for column in range(self.table.columnCount()):
             item = self.table.item(row, column)
             if item is not None:
@@ -65,6 +67,11 @@ class AcquisitionInfo(QtWidgets.QDialog):
 
         self.table.update()
         
+    def update_task_metrics(self, row, metrics):
+        self.table.item(row, 3).setText(metrics)
+        self.table.item(row, 3).setToolTip(metrics)
+        self.table.resizeColumnToContents(3)
+
     def __update_task_state(self, row, state):
         self.table.item(row, 1).setText(state)
     
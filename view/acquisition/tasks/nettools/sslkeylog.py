@@ -11,6 +11,7 @@ import os
 from PyQt6 import QtCore
 
 from common.constants import logger as Logger, state, status, tasks
+from common.tls import KEY_LOG_FILENAME, save_browser_key_log
 
 from view.acquisition.tasks.task import AcquisitionTask
 
@@ -22,9 +23,13 @@ class AcquisitionSSLKeyLog(AcquisitionTask):
 
     def start(self, folder):
 
-        sslkeylog.set_keylog(os.path.join(folder, 'sslkey.log'))
+        filename = os.path.join(folder, KEY_LOG_FILENAME)
+        keys = save_browser_key_log(filename, self.parent().key_log_position)
+        # the keys of the TLS sessions opened by python (e.g. SSL certificate)
+        sslkeylog.set_keylog(filename)
         
         self.parent().logger.info(Logger.SSLKEYLOG_GET)
+        self.parent().logger.info(Logger.SSLKEYLOG_BROWSER.format(keys))
         self.parent().task_is_completed({
                                 'name' : tasks.SSLKEYLOG,
                                 'state' : state.FINISHED,
@@ -8,9 +8,16 @@
 ######  
 
 import scapy.all as scapy
+import collections
+import functools
+import math
 import os
+import socket
+import threading
+import time
+from configparser import SafeConfigParser
 
-from PyQt6.QtCore import QObject, QEventLoop, QTimer, pyqtSignal, QThread
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, QThread
 from PyQt6.QtWidgets import QMessageBox
 
 from view.acquisition.base import Base
@@ -19,22 +26,108 @@ from view.error import Error as ErrorView
 
 from common.constants import logger, details, state, status, tasks
 from common.constants import tasks, error
+from common.hashing import HashingWriter
+from common.merkle import get_merkle_leaf_size
+from common.pcap import analyze, FlowIndex, TrafficSummary, FLOW_INDEX_SUFFIX, TRAFFIC_SUMMARY_SUFFIX
+from common.utility import format_size
+
+# ms waited for other hosts before the capture filter is updated
+FILTER_UPDATE_DELAY = 500
+# seconds a replaced sniffer is given to write the packets still in its socket
+SNIFFER_DRAIN_TIMEOUT = 2
+SNIFFER_IDLE_TIMEOUT = 0.2
+DNS_TYPE_A = 1
+DNS_TYPE_AAAA = 28
 
 class PacketCapture(QObject):
     finished = pyqtSignal() 
+    summary = pyqtSignal(dict)
+    telemetry = pyqtSignal(dict)
+    removed = pyqtSignal(str)
+    filter_changed = pyqtSignal(str)
+    filter_failed = pyqtSignal(str, str)
+    hosts_changed = pyqtSignal()
+    closed = pyqtSignal()
+    indexed = pyqtSignal(int, str)
+    index_failed = pyqtSignal(str)
+    summarized = pyqtSignal(int, str)
+    summary_failed = pyqtSignal(str)
 
     def __init__(self, parent=None):
         QObject.__init__(self, parent=parent)
         self.options = None
         self.output_file = None
-        self.sniffer = scapy.AsyncSniffer()
+        self.output = None
+        self.writer = None
+        self.sniffer = None
+        self.capture_filter = None
+        self.__capturing = False
+        self.__lock = threading.Lock()
+        self.__sniffer_lock = threading.Lock()
+        self.__hosts_lock = threading.Lock()
+        self.__hosts = set()
+        self.__addresses = set()
+        self.__packets = 0
+        self.__bytes = 0
+        self.__flushed = 0
+        self.__max_memory = 0
+        self.__file = 0
+        self.__file_first_packet = 0
+        self.__file_start = None
+        self.__file_end = None
+        self.__closed_files = collections.deque()
+        self.__start_time = 0
+        self.__telemetry_time = 0
+        self.__telemetry_packets = 0
 
     def set_options(self, options):
         self.output_file = os.path.join(options['acquisition_directory'], options['filename'])
+        self.files_filename = os.path.splitext(self.output_file)[0] + '_files.csv'
+        self.flows_filename = os.path.splitext(self.output_file)[0] + FLOW_INDEX_SUFFIX
+        self.traffic_filename = os.path.splitext(self.output_file)[0] + TRAFFIC_SUMMARY_SUFFIX
+
+        # a new file is started every rotation_size MiB or rotation_duration seconds, 0 disables the limit
+        self.rotation_size = (options.get('rotation_size') or 0) * 1024 * 1024
+        self.rotation_duration = options.get('rotation_duration') or 0
+        # beyond the budget the oldest rotated files are removed
+        self.disk_budget = (options.get('disk_budget') or 0) * 1024 * 1024
+        self.snaplen = options.get('snaplen') or 0
+
+        self.interface = options.get('interface') or scapy.conf.iface
+        self.bpf_filter = (options.get('bpf_filter') or '').strip()
+        # once the first host is added only DNS and the addresses of the added hosts are captured
+        self.auto_filter = bool(options.get('auto_filter'))
+
+        parser = SafeConfigParser()
+        parser.read('assets/config.ini')
+        # seconds between two telemetry updates, the pcap is flushed to disk at the same interval
+        self.telemetry_interval = max(0.1, parser.getfloat('fit_properties', 'telemetry_interval', fallback=1))
 
     def start(self):
         try:
-            self.sniffer.start()
+            self.__start_time = self.__telemetry_time = time.monotonic()
+            self.files = HashingWriter(self.files_filename, leaf_size=get_merkle_leaf_size())
+            self.files.write(b'file,filename,first_packet,packets,start,end,size,md5,sha1,sha256\n')
+            self.__open_file()
+            with self.__sniffer_lock:
+                self.capture_filter = self.__get_filter()
+                self.sniffer = self.__open_sniffer(self.capture_filter, 0)
+                self.__capturing = True
+            self.filter_changed.emit(self.capture_filter)
+
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.__emit_telemetry)
+            self.timer.start(int(self.telemetry_interval * 1000))
+
+            # many hosts are resolved together while a page loads, the filter is updated once for all of them
+            self.filter_timer = QTimer(self)
+            self.filter_timer.setSingleShot(True)
+            self.filter_timer.setInterval(FILTER_UPDATE_DELAY)
+            self.filter_timer.timeout.connect(self.__update_filter)
+            self.hosts_changed.connect(self.filter_timer.start)
+
+            # stop is called from the GUI thread, the capture is analyzed in the capture thread
+            self.closed.connect(self.__analyze)
         except Exception as e:
             error_dlg = ErrorView(QMessageBox.Icon.Critical,
                                   tasks.PACKET_CAPTURE,
@@ -44,16 +137,277 @@ class PacketCapture(QObject):
             error_dlg.exec()
 
     def stop(self):
-        self.sniffer.stop()
-        loop = QEventLoop()
-        QTimer.singleShot(1000, loop.quit)
-        loop.exec()
-        scapy.wrpcap(self.output_file, self.sniffer.results)
+        with self.__sniffer_lock:
+            self.__capturing = False
+            if self.sniffer is not None:
+                # the sniffer thread is joined, no packet is written after this
+                with self.__lock:
+                    self.sniffer[2][1] = time.time()
+                self.__close_sniffer(self.sniffer)
+        duration = time.monotonic() - self.__start_time
+
+        if self.writer is not None:
+            with self.__lock:
+                self.__close_file()
+            self.files.close()
+
+        self.summary.emit({
+            'packets': self.__packets,
+            'bytes': self.__bytes,
+            'duration': duration,
+            'rate': self.__packets / duration if duration > 0 else 0.0,
+            'disk': self.__bytes_on_disk(),
+            'max_memory': self.__max_memory
+        })
+
+        if self.sniffer is not None:
+            self.closed.emit()
+        else:
+            self.finished.emit()
+
+    def __analyze(self):
+        # a single pass over the pcap files, after the capture so the sniffer is never slowed down
+        index, traffic = FlowIndex(), TrafficSummary()
+        try:
+            analyze([filename for filename, size in self.__closed_files], index, traffic)
+        except Exception as e:
+            self.index_failed.emit(str(e))
+            self.summary_failed.emit(str(e))
+            self.finished.emit()
+            return
+
+        try:
+            index.write(self.flows_filename, get_merkle_leaf_size())
+            self.indexed.emit(len(index.flows), os.path.basename(self.flows_filename))
+        except Exception as e:
+            self.index_failed.emit(str(e))
+
+        try:
+            traffic.write(self.traffic_filename, get_merkle_leaf_size())
+            self.summarized.emit(traffic.packets, os.path.basename(self.traffic_filename))
+        except Exception as e:
+            self.summary_failed.emit(str(e))
+
         self.finished.emit()
 
+    def add_host(self, host):
+        host = host.lower().rstrip('.')
+        with self.__hosts_lock:
+            if not self.auto_filter or not host or host in self.__hosts:
+                return
+            self.__hosts.add(host)
+
+        try:
+            addresses = {info[4][0].split('%')[0] for info in socket.getaddrinfo(host, None)}
+        except OSError:
+            addresses = set()
+        self.__add_addresses(addresses)
+
+    def __add_addresses(self, addresses):
+        with self.__hosts_lock:
+            addresses = addresses - self.__addresses
+            self.__addresses.update(addresses)
+        if addresses or self.capture_filter != self.__get_filter():
+            self.hosts_changed.emit()
+
+    def __get_filter(self):
+        filters = []
+        if self.bpf_filter:
+            filters.append('(' + self.bpf_filter + ')')
+        with self.__hosts_lock:
+            if self.auto_filter and self.__hosts:
+                filters.append('(' + ' or '.join(['port 53'] + ['host ' + address for address in
+                                                                 sorted(self.__addresses)]) + ')')
+
+        return ' and '.join(filters)
+
+    def __open_sniffer(self, capture_filter, since):
+        # the socket is opened here, so a wrong interface or filter is reported at once
+        # and the socket captures from now on, even before the sniffer thread reads it
+        listen_socket = scapy.resolve_iface(self.interface).l2listen()(type=scapy.ETH_P_ALL, iface=self.interface,
+                                                                       filter=capture_filter or None)
+        # only the packets in [since, until) are written, until is set when the sniffer is replaced
+        # or stopped, the third item is the last time the sniffer got a packet
+        window = [since, math.inf, time.monotonic()]
+        sniffer = scapy.AsyncSniffer(opened_socket=listen_socket, prn=functools.partial(self.__sniffed, window),
+                                     stop_filter=lambda packet: packet.time >= window[1], store=False)
+        sniffer.start()
+
+        return sniffer, listen_socket, window
+
+    def __close_sniffer(self, sniffer):
+        sniffer, listen_socket, window = sniffer
+        # the packets already in the socket are written first: the sniffer stops by itself
+        # at the first packet after its window, or when no more packets come
+        deadline = time.monotonic() + SNIFFER_DRAIN_TIMEOUT
+        while sniffer.thread.is_alive() and time.monotonic() < deadline and \
+                time.monotonic() - window[2] < SNIFFER_IDLE_TIMEOUT:
+            sniffer.join(SNIFFER_IDLE_TIMEOUT / 4)
+        try:
+            if sniffer.running:
+                sniffer.stop()
+        except scapy.Scapy_Exception:
+            # it has just stopped by itself
+            pass
+        listen_socket.close()
+
+    def __update_filter(self):
+        with self.__sniffer_lock:
+            capture_filter = self.__get_filter()
+            if not self.__capturing or capture_filter == self.capture_filter:
+                return
+
+            try:
+                sniffer = self.__open_sniffer(capture_filter, math.inf)
+            except Exception as e:
+                # e.g. too many addresses for a BPF program: the auto filter is dropped and nothing is lost
+                self.filter_failed.emit(capture_filter, str(e))
+                with self.__hosts_lock:
+                    self.auto_filter = False
+                capture_filter = self.__get_filter()
+                if capture_filter == self.capture_filter:
+                    return
+                try:
+                    sniffer = self.__open_sniffer(capture_filter, math.inf)
+                except Exception as e:
+                    self.filter_failed.emit(capture_filter, str(e))
+                    return
+
+            # both sniffers are capturing: the packets before now are written by the old one
+            # and the others by the new one, so there are neither gaps nor duplicates
+            with self.__lock:
+                sniffer[2][0] = self.sniffer[2][1] = time.time()
+            self.__close_sniffer(self.sniffer)
+            self.sniffer = sniffer
+            self.capture_filter = capture_filter
+        self.filter_changed.emit(capture_filter)
+
+    def __sniffed(self, window, packet):
+        # called by the sniffer threads for every packet
+        window[2] = time.monotonic()
+        if self.__write(window, packet) and self.auto_filter and packet.haslayer(scapy.DNS):
+            self.__resolved(packet[scapy.DNS])
+
+    def __resolved(self, dns):
+        # the addresses the browser got for the added hosts, whatever the addresses FIT resolved
+        try:
+            if dns.qr != 1 or not dns.qdcount:
+                return
+            with self.__hosts_lock:
+                if dns.qd.qname.decode().lower().rstrip('.') not in self.__hosts:
+                    return
+            addresses = {str(dns.an[i].rdata) for i in range(dns.ancount) if dns.an[i].type in (DNS_TYPE_A, DNS_TYPE_AAAA)}
+        except (IndexError, AttributeError, UnicodeDecodeError):
+            return
+        self.__add_addresses(addresses)
+
+    def __write(self, window, packet):
+        raw = bytes(packet)
+        sec = int(packet.time)
+        usec = int(round((packet.time - sec) * 1000000))
+
+        with self.__lock:
+            if not window[0] <= packet.time < window[1]:
+                return False
+
+            if self.__is_file_full(packet.time):
+                self.__close_file()
+                self.__open_file()
+
+            if not self.writer.header_present:
+                self.writer.write_header(packet)
+            # with a snaplen only the first bytes (the headers) are saved, the original length is kept
+            self.writer.write_packet(raw[:self.snaplen] if self.snaplen else raw,
+                                     sec=sec, usec=usec, wirelen=len(raw))
+
+            if self.__file_start is None:
+                self.__file_start = packet.time
+            self.__file_end = packet.time
+            self.__packets += 1
+            self.__bytes += len(raw)
+
+        return True
+
+
+    def __is_file_full(self, packet_time):
+        if self.__packets == self.__file_first_packet:
+            return False
+        if self.rotation_duration and packet_time - self.__file_start >= self.rotation_duration:
+            return True
+
+        return bool(self.rotation_size) and self.output.tell() >= self.rotation_size
+
+    def __open_file(self):
+        self.__file += 1
+        filename = self.output_file
+        if self.rotation_size or self.rotation_duration:
+            name, extension = os.path.splitext(self.output_file)
+            filename = '{}_{:04d}{}'.format(name, self.__file, extension)
+
+        self.__file_first_packet = self.__packets
+        self.__file_start = self.__file_end = None
+        self.__flushed = 0
+        self.output = HashingWriter(filename, leaf_size=get_merkle_leaf_size())
+        self.writer = scapy.PcapWriter(self.output, snaplen=self.snaplen or 65535)
+
+    def __close_file(self):
+        # the file has been hashed while it was written
+        self.writer.close()
+        file_hash = self.output.file_hash
+        self.files.write('{},{},{},{},{},{},{},{},{},{}\n'.format(
+            self.__file, os.path.basename(self.output.filename), self.__file_first_packet,
+            self.__packets - self.__file_first_packet,
+            '' if self.__file_start is None else '{:.6f}'.format(self.__file_start),
+            '' if self.__file_end is None else '{:.6f}'.format(self.__file_end),
+            file_hash.size, file_hash.hexdigest('md5'), file_hash.hexdigest('sha1'),
+            file_hash.hexdigest('sha256')).encode())
+        self.files.flush()
+
+        self.__closed_files.append((self.output.filename, file_hash.size))
+        # the newest file is always kept, its row in the files list keeps the hashes of the removed ones
+        while self.disk_budget and len(self.__closed_files) > 1 and \
+                sum(size for filename, size in self.__closed_files) > self.disk_budget:
+            filename, size = self.__closed_files.popleft()
+            os.remove(filename)
+            self.removed.emit(os.path.basename(filename))
+
+    def __bytes_on_disk(self):
+        size = sum(size for filename, size in self.__closed_files)
+        if self.output is not None and not self.output.closed:
+            size += self.output.tell()
+
+        return size
+
+    def __emit_telemetry(self):
+        if not self.__capturing:
+            return
+
+        with self.__lock:
+            # bytes still in the write buffer when the file is flushed
+            tell = self.output.tell()
+            memory = tell - self.__flushed
+            self.__max_memory = max(self.__max_memory, memory)
+            self.output.flush()
+            self.__flushed = tell
+            disk = self.__bytes_on_disk()
+
+        timestamp = time.monotonic()
+        packets = self.__packets
+        rate = (packets - self.__telemetry_packets) / (timestamp - self.__telemetry_time)
+        self.__telemetry_time = timestamp
+        self.__telemetry_packets = packets
+
+        self.telemetry.emit({
+            'rate': rate,
+            'packets': packets,
+            'disk': disk,
+            'memory': memory
+        })
+
 
 
 class AcquisitionPacketCapture(AcquisitionTask):
+    host_requested = pyqtSignal(str)
 
     def __init__(self, name, state, status, parent: None):
         super().__init__(name, state, status, parent)
@@ -66,6 +420,16 @@ class AcquisitionPacketCapture(AcquisitionTask):
         self.packetcapture.moveToThread(self.th_packetcapture)
 
         self.th_packetcapture.started.connect(self.packetcapture.start)
+        self.packetcapture.summary.connect(self.__log_summary)
+        self.packetcapture.telemetry.connect(self.__show_telemetry)
+        self.packetcapture.removed.connect(self.__log_removed)
+        self.packetcapture.filter_changed.connect(self.__log_filter)
+        self.packetcapture.filter_failed.connect(self.__log_filter_failed)
+        self.packetcapture.indexed.connect(self.__log_indexed)
+        self.packetcapture.index_failed.connect(self.__log_index_failed)
+        self.packetcapture.summarized.connect(self.__log_summarized)
+        self.packetcapture.summary_failed.connect(self.__log_summary_failed)
+        self.host_requested.connect(self.packetcapture.add_host)
         self.packetcapture.finished.connect(self.th_packetcapture.quit)
         self.packetcapture.finished.connect(self.packetcapture.deleteLater)
         self.th_packetcapture.finished.connect(self.th_packetcapture.deleteLater)
@@ -81,8 +445,47 @@ class AcquisitionPacketCapture(AcquisitionTask):
 
     def stop(self):
         self.packetcapture.stop()
+
+    def add_host(self, host):
+        # the host is resolved and added to the filter in the capture thread
+        self.host_requested.emit(host)
  
 
+    def __log_summary(self, summary):
+        self.parent().logger.info(logger.NETWORK_PACKET_CAPTURE_SUMMARY.format(**summary))
+        self.__show_telemetry({
+            'rate': summary['rate'],
+            'packets': summary['packets'],
+            'disk': summary['disk'],
+            'memory': 0
+        })
+
+    def __log_filter(self, capture_filter):
+        self.parent().logger.info(logger.NETWORK_PACKET_CAPTURE_FILTER.format(capture_filter or 'none'))
+
+    def __log_filter_failed(self, capture_filter, error):
+        self.parent().logger.warning(logger.NETWORK_PACKET_CAPTURE_FILTER_FAILED.format(capture_filter, error))
+
+    def __log_indexed(self, flows, filename):
+        self.parent().logger.info(logger.NETWORK_FLOW_INDEX.format(flows, filename))
+
+    def __log_summarized(self, packets, filename):
+        self.parent().logger.info(logger.NETWORK_TRAFFIC_SUMMARY.format(packets, filename))
+
+    def __log_index_failed(self, error):
+        self.parent().logger.error(logger.NETWORK_FLOW_INDEX_FAILED.format(error))
+
+    def __log_summary_failed(self, error):
+        self.parent().logger.error(logger.NETWORK_TRAFFIC_SUMMARY_FAILED.format(error))
+
+    def __log_removed(self, filename):
+        self.parent().logger.info(logger.NETWORK_PACKET_CAPTURE_FILE_REMOVED.format(filename))
+
+    def __show_telemetry(self, telemetry):
+        telemetry = dict(telemetry, disk=format_size(telemetry['disk']), memory=format_size(telemetry['memory']))
+        self.parent().update_task_metrics(tasks.PACKET_CAPTURE,
+                                          details.NETWORK_PACKET_CAPTURE_TELEMETRY.format(**telemetry))
+
     def _thread_packetcapture_is_finished(self):
         self.parent().logger.info(logger.NETWORK_PACKET_CAPTURE_COMPLETED)
         self.parent().task_is_completed({
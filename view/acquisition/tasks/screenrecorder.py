@@ -8,7 +8,13 @@
 ######  
 import cv2
 import numpy as np
+import os
+import queue
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from configparser import SafeConfigParser
 
 from PIL import ImageGrab
 from PyQt6.QtCore import QObject, pyqtSignal, QThread
@@ -23,22 +29,56 @@ from controller.configurations.tabs.screenrecorder.codec import Codec as CodecCo
 from common.constants import logger, details, state, status, tasks
 from common.constants import error
 from common.constants.view import screenrecorder
+from common.constants.view.screenrecorder import REGION_RECTANGLE, REGION_WINDOW
+from common.hashing import HashingWriter, calculate_hashes, register_hash
+from common.merkle import get_merkle_leaf_size
+from common.utility import format_size
 
 
 class ScreenRecorder(QObject):
     finished = pyqtSignal()
+    summary = pyqtSignal(dict)
+    telemetry = pyqtSignal(dict)
+    hash_failed = pyqtSignal(str, str)  # segment filename, error
 
     def __init__(self, parent=None):
         QObject.__init__(self, parent=parent)
         self.run = True
         self.destroyed.connect(self.stop)
         self.controller = CodecController()
+        self.__start_time = 0
+        self.__stop_time = None
+        self.__last_frame = None
+        self.__frames = 0
+        self.__captured = 0
+        self.__duplicated = 0
+        self.__dropped = 0
+        self.__skipped = 0
+        self.__static = 0
+        self.__segment = 0
+        self.__segment_filename = None
+        self.__segment_first_frame = 0
+        self.__segment_start = 0
+        self.__hash_futures = []
+        self.__max_delay = 0
+        self.__grabs = 0
+        self.__max_queue = 0
+        self.__closed_bytes = 0
+        self.__telemetry_time = 0
+        self.__telemetry_grabs = 0
+        self.__exception = None
 
     def set_options(self, options):
 
-        # Specify resolution
-        self.width = get_monitors()[0].width
-        self.height = get_monitors()[0].height
+        # Specify the captured region and the resolution of the video
+        self.bbox, self.all_screens = self.__get_region(options)
+        self.scale = max(1, options.get('scale') or 1)
+        self.width = self.bbox[2] - self.bbox[0]
+        self.height = self.bbox[3] - self.bbox[1]
+        if self.scale > 1:
+            # most codecs want even sizes
+            self.width = max(2, self.width // self.scale // 2 * 2)
+            self.height = max(2, self.height // self.scale // 2 * 2)
         # Specify video codec       
         codec = next((item for item in self.controller.codec if item["id"] == options['codec_id']))
         self.codec = cv2.VideoWriter_fourcc(*codec["name"])
@@ -50,34 +90,156 @@ class ScreenRecorder(QObject):
         # Specify name of Output file
         self.filename = options['filename']
 
+        # frames preallocated for the capture/encoder ring
+        parser = SafeConfigParser()
+        parser.read('assets/config.ini')
+        self.buffers = max(2, parser.getint('fit_properties', 'screenrecorder_buffers', fallback=4))
+        # one pixel every sample_step, in both directions, is compared to detect unchanged frames
+        self.sample_step = max(1, parser.getint('fit_properties', 'screenrecorder_change_sample', fallback=2))
+        # seconds between two telemetry updates
+        self.telemetry_interval = max(0.1, parser.getfloat('fit_properties', 'telemetry_interval', fallback=1))
+
+        # unchanged frames are not written at all, their time is in the timestamps file
+        self.variable_frame_rate = bool(options.get('variable_frame_rate'))
+        self.timestamps_filename = os.path.splitext(self.filename)[0] + '_timestamps.csv'
+
+        # a new file is started every segment_duration seconds or segment_size MiB, 0 disables the limit
+        self.segment_duration = options.get('segment_duration') or 0
+        self.segment_size = (options.get('segment_size') or 0) * 1024 * 1024
+        self.segments_filename = os.path.splitext(self.filename)[0] + '_segments.csv'
+
+    def __get_region(self, options):
+        monitors = get_monitors()
+        region = None
+        if options.get('region') == REGION_WINDOW:
+            region = options.get('window')
+        elif options.get('region') == REGION_RECTANGLE:
+            try:
+                region = [int(value) for value in options.get('rectangle', '').split(',')]
+            except ValueError:
+                region = None
+            if region is not None and (len(region) != 4 or region[2] <= 0 or region[3] <= 0):
+                region = None
+
+        if region is None:
+            monitor = monitors[min(max(options.get('monitor') or 0, 0), len(monitors) - 1)]
+            region = (monitor.x, monitor.y, monitor.width, monitor.height)
+
+        x, y, width, height = region
+        bbox = (x, y, x + width, y + height)
+
+        # grabbing all the screens is needed (and slower) only outside the primary monitor
+        primary = next((monitor for monitor in monitors if monitor.is_primary), monitors[0])
+        all_screens = not (primary.x <= bbox[0] and primary.y <= bbox[1] and
+                           bbox[2] <= primary.x + primary.width and bbox[3] <= primary.y + primary.height)
+
+        return bbox, all_screens
+
     def start(self):
+        leaf_size = get_merkle_leaf_size()
+        self.timestamps = HashingWriter(self.timestamps_filename, leaf_size=leaf_size)
+        self.timestamps.write(b'frame,time,source,segment\n')
+        # closed segments are hashed while the recording goes on
+        self.segments = HashingWriter(self.segments_filename, leaf_size=leaf_size)
+        self.segments.write(b'segment,filename,first_frame,frames,start,end,size,md5,sha1,sha256\n')
+        self.__hash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screenrecorder-hash')
+
         # Creating a VideoWriter object
-        self.out = cv2.VideoWriter(self.filename, self.codec, self.fps, (self.width, self.height))
+        self.__open_segment(0)
+
+        # capture and encoding run in two threads sharing a ring of preallocated frames
+        free_frames = queue.Queue()
+        for i in range(self.buffers):
+            free_frames.put(np.empty((self.height, self.width, 3), np.uint8))
+        captured_frames = queue.Queue()
+        encoder = threading.Thread(target=self.__encode, args=(free_frames, captured_frames),
+                                   name='screenrecorder-encoder')
+
+        # frames are captured on the ticks of a monotonic clock, so that the video lasts as long as the acquisition
+        # whatever the speed of the machine (perf_counter, time.monotonic ticks every 15.6 ms on Windows)
+        self.__start_time = time.perf_counter()
+        self.__telemetry_time = self.__start_time
+        self.memory = (self.buffers + 1) * self.height * self.width * 3
+        encoder.start()
+        exception = None
         try:
-            while self.run:
-                # Take screenshot using PyAutoGUI
-                img = ImageGrab.grab(bbox=(0, 0, self.width, self.height))
+            next_tick = 0
+            previous_sample = None
+            scaled = np.empty((self.height, self.width, 3), np.uint8)
+            while self.run and self.__exception is None:
+                tick = self.__start_time + next_tick / self.fps
+                delay = tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                timestamp = time.perf_counter()
+                self.__max_delay = max(self.__max_delay, timestamp - tick)
+                next_tick = int((timestamp - self.__start_time) * self.fps) + 1
 
-                # Convert the screenshot to a numpy array
-                frame = np.array(img)
+                # Take screenshot using PyAutoGUI
+                img = ImageGrab.grab(bbox=self.bbox, all_screens=self.all_screens)
+                pixels = np.asarray(img)
+                self.__grabs += 1
+
+                if timestamp - self.__telemetry_time >= self.telemetry_interval:
+                    self.telemetry.emit(self.__telemetry(timestamp, captured_frames.qsize()))
+
+                # a static screen is neither converted nor encoded again
+                sample = pixels[::self.sample_step, ::self.sample_step]
+                if previous_sample is not None and np.array_equal(sample, previous_sample):
+                    self.__static += 1
+                    continue
+
+                try:
+                    frame = free_frames.get_nowait()
+                except queue.Empty:
+                    # the encoder is late, the slot will repeat the previous frame
+                    self.__skipped += 1
+                    continue
+
+                # downscaled (or grabbed at a different pixel ratio) frames are resized in a preallocated buffer
+                if pixels.shape[:2] != scaled.shape[:2]:
+                    cv2.resize(pixels, (self.width, self.height), dst=scaled, interpolation=cv2.INTER_AREA)
+                    pixels = scaled
+
+                # Convert it from RGB(Red, Green, Blue) to BGR(Blue, Green, Red) into the preallocated frame
+                cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR, dst=frame)
+
+                captured_frames.put((frame, timestamp))
+                self.__max_queue = max(self.__max_queue, captured_frames.qsize())
+                previous_sample = sample.copy()
 
-                # Convert it from BGR(Blue, Green, Red) to RGB(Red, Green, Blue)
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        except:
+            exception = sys.exc_info()[0]
 
-                # Write it to the output file
-                self.out.write(frame)
+        # the last frame lasts until the recorder is stopped
+        self.__stop_time = time.perf_counter()
+        captured_frames.put(None)
+        encoder.join()
 
-        except:
+        exception = exception or self.__exception
+        if exception is not None:
             error_dlg = ErrorView(QMessageBox.Icon.Critical,
                                   screenrecorder.SCREEN_RECODER,
                                   error.SCREEN_RECODER,
-                                  str(sys.exc_info()[0])
+                                  str(exception)
                                   )
 
             error_dlg.exec()
 
         # Release the Video writer
-        self.out.release()
+        self.__close_segment(self.__stop_time - self.__start_time)
+        self.timestamps.close()
+        self.summary.emit(self.__summary())
+
+        # VideoWriter owns the file descriptor, so the segments are hashed here
+        # on the recorder thread while the other stop tasks are still running
+        self.__hash_executor.shutdown(wait=True)
+        for filename, future in self.__hash_futures:
+            try:
+                future.result()
+            except Exception as e:
+                self.hash_failed.emit(os.path.basename(filename), str(e))
+        self.segments.close()
 
         self.finished.emit()  # emit the finished signal when the loop is done
         # Destroy all windows
@@ -86,6 +248,136 @@ class ScreenRecorder(QObject):
     def stop(self):
         self.run = False  # set the run condition to false on stop 
 
+    def __encode(self, free_frames, captured_frames):
+        try:
+            while (item := captured_frames.get()) is not None:
+                frame, timestamp = item
+                previous_frame = self.__last_frame
+                if self.__write(frame, timestamp):
+                    # the last written frame is kept out of the ring, it may be repeated
+                    if previous_frame is not None:
+                        free_frames.put(previous_frame)
+                else:
+                    free_frames.put(frame)
+
+            self.__write(None, self.__stop_time)
+        except:
+            self.__exception = sys.exc_info()[0]
+            # keep draining, the capture thread stops at the next tick
+            while captured_frames.get() is not None:
+                pass
+
+    def __write(self, frame, timestamp):
+        # every frame fills the slot of the tick it was captured at
+        slot = int((timestamp - self.__start_time) * self.fps)
+        if frame is not None and slot < self.__frames:
+            # the slot already has a frame
+            self.__dropped += 1
+            return False
+
+        # slots missed while capturing, or with an unchanged screen, repeat the previous frame
+        while not self.variable_frame_rate and self.__last_frame is not None and self.__frames < slot:
+            self.__write_frame(self.__last_frame, self.__frames / self.fps, 'repeated')
+            self.__duplicated += 1
+
+        if frame is not None:
+            self.__write_frame(frame, timestamp - self.__start_time, 'captured')
+            self.__captured += 1
+            self.__last_frame = frame
+
+        return frame is not None
+
+    def __write_frame(self, frame, seconds, source):
+        if self.__is_segment_full(seconds):
+            self.__close_segment(seconds)
+            self.__open_segment(seconds)
+
+        self.out.write(frame)
+        self.timestamps.write('{},{:.6f},{},{}\n'.format(self.__frames, seconds, source, self.__segment).encode())
+        self.__frames += 1
+
+    def __is_segment_full(self, seconds):
+        if self.__frames == self.__segment_first_frame:
+            return False
+        if self.segment_duration and seconds - self.__segment_start >= self.segment_duration:
+            return True
+
+        return bool(self.segment_size) and os.path.getsize(self.__segment_filename) >= self.segment_size
+
+    def __open_segment(self, seconds):
+        self.__segment += 1
+        self.__segment_filename = self.filename
+        if self.segment_duration or self.segment_size:
+            name, extension = os.path.splitext(self.filename)
+            self.__segment_filename = '{}_{:04d}{}'.format(name, self.__segment, extension)
+
+        self.__segment_first_frame = self.__frames
+        self.__segment_start = seconds
+        self.out = cv2.VideoWriter(self.__segment_filename, self.codec, self.fps, (self.width, self.height))
+
+    def __close_segment(self, seconds):
+        self.out.release()
+        if os.path.isfile(self.__segment_filename):
+            self.__closed_bytes += os.path.getsize(self.__segment_filename)
+        self.timestamps.flush()
+        future = self.__hash_executor.submit(self.__hash_segment, self.__segment, self.__segment_filename,
+                                             self.__segment_first_frame, self.__frames - self.__segment_first_frame,
+                                             self.__segment_start, seconds)
+        self.__hash_futures.append((self.__segment_filename, future))
+
+    def __hash_segment(self, segment, filename, first_frame, frames, start, end):
+        if not os.path.isfile(filename):
+            raise FileNotFoundError('the segment has not been written')
+
+        file_hash = calculate_hashes(filename, leaf_size=get_merkle_leaf_size())
+        register_hash(file_hash)
+        # one row for each closed segment, a crash loses at most the last one
+        self.segments.write('{},{},{},{},{:.6f},{:.6f},{},{},{},{}\n'.format(
+            segment, os.path.basename(filename), first_frame, frames, start, end, file_hash.size,
+            file_hash.hexdigest('md5'), file_hash.hexdigest('sha1'), file_hash.hexdigest('sha256')).encode())
+        self.segments.flush()
+
+    def __bytes_on_disk(self):
+        size = self.__closed_bytes
+        try:
+            size += os.path.getsize(self.__segment_filename)
+        except OSError:
+            pass
+
+        return size
+
+    def __telemetry(self, timestamp, queue_depth):
+        fps = (self.__grabs - self.__telemetry_grabs) / (timestamp - self.__telemetry_time)
+        self.__telemetry_time = timestamp
+        self.__telemetry_grabs = self.__grabs
+
+        return {
+            'fps': fps,
+            'dropped': self.__dropped + self.__skipped,
+            'queue': queue_depth,
+            'disk': self.__bytes_on_disk(),
+            'memory': self.memory
+        }
+
+    def __summary(self):
+        duration = (self.__stop_time or time.perf_counter()) - self.__start_time
+        return {
+            'fps': self.fps,
+            'duration': duration,
+            'frames': self.__frames,
+            'captured': self.__captured,
+            'duplicated': self.__duplicated,
+            'dropped': self.__dropped + self.__skipped,
+            'static': self.__static,
+            # with a variable frame rate the time of every frame is in the timestamps file
+            'drift': 0.0 if self.variable_frame_rate else self.__frames / self.fps - duration,
+            'max_delay': self.__max_delay,
+            'achieved_fps': self.__grabs / duration if duration > 0 else 0.0,
+            'max_queue': self.__max_queue,
+            'disk': self.__closed_bytes,
+            'memory': self.memory
+        }
+
 
 class AcquisitionScreenRecorder(AcquisitionTask):
 
@@ -101,6 +393,9 @@ class AcquisitionScreenRecorder(AcquisitionTask):
 
         self.th_screenrecorder.started.connect(self.screenrecorder.start)
 
+        self.screenrecorder.summary.connect(self.__log_summary)
+        self.screenrecorder.telemetry.connect(self.__show_telemetry)
+        self.screenrecorder.hash_failed.connect(self.__log_hash_failure)
         self.screenrecorder.finished.connect(self.th_screenrecorder.quit)
         self.screenrecorder.finished.connect(self.screenrecorder.deleteLater)
         self.th_screenrecorder.finished.connect(self.th_screenrecorder.deleteLater)
@@ -116,6 +411,23 @@ class AcquisitionScreenRecorder(AcquisitionTask):
     def stop(self):
         self.screenrecorder.stop()
 
+    def __log_summary(self, summary):
+        self.parent().logger.info(logger.SCREEN_RECORDER_SUMMARY.format(**summary))
+        self.__show_telemetry({
+            'fps': summary['achieved_fps'],
+            'dropped': summary['dropped'],
+            'queue': 0,
+            'disk': summary['disk'],
+            'memory': summary['memory']
+        })
+
+    def __log_hash_failure(self, filename, error):
+        self.parent().logger.error(logger.SCREEN_RECORDER_HASH_FAILED.format(filename, error))
+
+    def __show_telemetry(self, telemetry):
+        telemetry = dict(telemetry, disk=format_size(telemetry['disk']), memory=format_size(telemetry['memory']))
+        self.parent().update_task_metrics(tasks.SCREEN_RECORDER, details.SCREEN_RECORDER_TELEMETRY.format(**telemetry))
+
     def _thread_screenrecorder_is_finished(self):
         self.parent().logger.info(logger.SCREEN_RECODER_PACKET_CAPTURE_COMPLETED)
 
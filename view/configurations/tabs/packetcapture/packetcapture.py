@@ -7,6 +7,7 @@
 # -----
 ######  
 
+import scapy.all as scapy
 from PyQt6 import QtCore, QtWidgets
 from controller.configurations.tabs.packetcapture.packetcapture import PacketCapture as PacketCaptureController
 from common.utility import is_npcap_installed, get_platform
@@ -48,15 +49,89 @@ class PacketCapture(QtWidgets.QWidget):
         self.filename.setObjectName("filename")
 
 
+        #ROTATION
+        self.group_box_rotation_size = QtWidgets.QGroupBox(self)
+        self.group_box_rotation_size.setGeometry(QtCore.QRect(10, 190, 160, 70))
+        self.group_box_rotation_size.setObjectName("group_box_rotation_size")
+        self.rotation_size = QtWidgets.QSpinBox(self.group_box_rotation_size)
+        self.rotation_size.setGeometry(QtCore.QRect(20, 30, 100, 22))
+        self.rotation_size.setRange(0, 1048576)
+        self.rotation_size.setObjectName("rotation_size")
+
+        self.group_box_rotation_duration = QtWidgets.QGroupBox(self)
+        self.group_box_rotation_duration.setGeometry(QtCore.QRect(180, 190, 160, 70))
+        self.group_box_rotation_duration.setObjectName("group_box_rotation_duration")
+        self.rotation_duration = QtWidgets.QSpinBox(self.group_box_rotation_duration)
+        self.rotation_duration.setGeometry(QtCore.QRect(20, 30, 100, 22))
+        self.rotation_duration.setRange(0, 86400)
+        self.rotation_duration.setObjectName("rotation_duration")
+
+        #DISK BUDGET
+        self.group_box_disk_budget = QtWidgets.QGroupBox(self)
+        self.group_box_disk_budget.setGeometry(QtCore.QRect(350, 190, 160, 70))
+        self.group_box_disk_budget.setObjectName("group_box_disk_budget")
+        self.disk_budget = QtWidgets.QSpinBox(self.group_box_disk_budget)
+        self.disk_budget.setGeometry(QtCore.QRect(20, 30, 100, 22))
+        self.disk_budget.setRange(0, 1048576)
+        self.disk_budget.setObjectName("disk_budget")
+
+        #SNAPLEN
+        self.group_box_snaplen = QtWidgets.QGroupBox(self)
+        self.group_box_snaplen.setGeometry(QtCore.QRect(520, 190, 160, 70))
+        self.group_box_snaplen.setObjectName("group_box_snaplen")
+        self.snaplen = QtWidgets.QSpinBox(self.group_box_snaplen)
+        self.snaplen.setGeometry(QtCore.QRect(20, 30, 100, 22))
+        self.snaplen.setRange(0, 262144)
+        self.snaplen.setObjectName("snaplen")
+
+        #INTERFACE
+        self.group_box_interface = QtWidgets.QGroupBox(self)
+        self.group_box_interface.setGeometry(QtCore.QRect(10, 270, 250, 70))
+        self.group_box_interface.setObjectName("group_box_interface")
+        self.interface = QtWidgets.QComboBox(self.group_box_interface)
+        self.interface.setGeometry(QtCore.QRect(20, 30, 210, 22))
+        self.interface.setObjectName("interface")
+        self.interface.addItem("Default", "")
+        for interface in scapy.conf.ifaces.values():
+            self.interface.addItem(interface.description or interface.name, interface.name)
+
+        #BPF FILTER
+        self.group_box_bpf_filter = QtWidgets.QGroupBox(self)
+        self.group_box_bpf_filter.setGeometry(QtCore.QRect(270, 270, 401, 70))
+        self.group_box_bpf_filter.setObjectName("group_box_bpf_filter")
+        self.bpf_filter = QtWidgets.QLineEdit(self.group_box_bpf_filter)
+        self.bpf_filter.setGeometry(QtCore.QRect(20, 30, 361, 22))
+        self.bpf_filter.setPlaceholderText("e.g. not port 22")
+        self.bpf_filter.setObjectName("bpf_filter")
+
+        #AUTO FILTER
+        self.auto_filter = QtWidgets.QCheckBox("Capture only DNS and the hosts requested by the browser", self)
+        self.auto_filter.setGeometry(QtCore.QRect(10, 350, 450, 30))
+        self.auto_filter.setObjectName("auto_filter")
+
+
 
    def retranslateUi(self):
         _translate = QtCore.QCoreApplication.translate
         self.setWindowTitle(_translate("PacketCapture", "Packet Capture Options"))
         self.group_box_filename.setTitle(_translate("PacketCapture", "File Name"))
+        self.group_box_rotation_size.setTitle(_translate("PacketCapture", "Rotate every (MiB)"))
+        self.group_box_rotation_duration.setTitle(_translate("PacketCapture", "Rotate every (s)"))
+        self.group_box_disk_budget.setTitle(_translate("PacketCapture", "Disk budget (MiB)"))
+        self.group_box_snaplen.setTitle(_translate("PacketCapture", "Snaplen (bytes)"))
+        self.group_box_interface.setTitle(_translate("PacketCapture", "Interface"))
+        self.group_box_bpf_filter.setTitle(_translate("PacketCapture", "Capture filter (BPF)"))
 
 
    def _is_enabled_packet_capture(self):
         self.group_box_filename.setEnabled(self.enabled_checkbox.isChecked())
+        self.group_box_rotation_size.setEnabled(self.enabled_checkbox.isChecked())
+        self.group_box_rotation_duration.setEnabled(self.enabled_checkbox.isChecked())
+        self.group_box_disk_budget.setEnabled(self.enabled_checkbox.isChecked())
+        self.group_box_snaplen.setEnabled(self.enabled_checkbox.isChecked())
+        self.group_box_interface.setEnabled(self.enabled_checkbox.isChecked())
+        self.group_box_bpf_filter.setEnabled(self.enabled_checkbox.isChecked())
+        self.auto_filter.setEnabled(self.enabled_checkbox.isChecked())
 
    def __set_current_config_values(self):
         enabled = self.controller.options['enabled']
@@ -66,6 +141,17 @@ class PacketCapture(QtWidgets.QWidget):
 
         self.enabled_checkbox.setChecked(enabled)
         self.filename.setText(self.controller.options['filename'])
+        self.rotation_size.setValue(self.controller.options['rotation_size'])
+        self.rotation_duration.setValue(self.controller.options['rotation_duration'])
+        self.disk_budget.setValue(self.controller.options['disk_budget'])
+        self.snaplen.setValue(self.controller.options['snaplen'])
+        interface = self.controller.options['interface']
+        if self.interface.findData(interface) < 0:
+            # an interface not connected now
+            self.interface.addItem(interface, interface)
+        self.interface.setCurrentIndex(self.interface.findData(interface))
+        self.bpf_filter.setText(self.controller.options['bpf_filter'])
+        self.auto_filter.setChecked(self.controller.options['auto_filter'])
         self._is_enabled_packet_capture()
 
    def __get_current_values(self):
@@ -73,8 +159,12 @@ class PacketCapture(QtWidgets.QWidget):
             item = self.findChild(QtCore.QObject, keyword)
 
             if item is not None:
-                if isinstance(item, QtWidgets.QLineEdit) is not False and item.text():
+                if isinstance(item, QtWidgets.QLineEdit):
                     item = item.text()
+                elif isinstance(item, QtWidgets.QComboBox):
+                    item = item.currentData()
+                elif isinstance(item, QtWidgets.QSpinBox):
+                    item = item.value()
                 elif isinstance(item, QtWidgets.QCheckBox):
                     item = item.isChecked()
 
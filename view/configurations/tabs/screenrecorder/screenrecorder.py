@@ -12,6 +12,7 @@ from PyQt6 import QtCore, QtWidgets
 
 from view.configurations.tabs.screenrecorder.codec import Codec as CodecView
 from controller.configurations.tabs.screenrecorder.screenrecorder import ScreenRecorder as ScreenRecorderController
+from common.constants.view.screenrecorder import REGIONS, REGION_MONITOR, REGION_RECTANGLE
 
 __is_tab__ = True
 
@@ -52,6 +53,24 @@ class ScreenRecorder(QtWidgets.QWidget):
         self.group_box_codec.codec.setObjectName('codec_id')
 
 
+        #SEGMENTS
+        self.group_box_segment_duration = QtWidgets.QGroupBox(self)
+        self.group_box_segment_duration.setGeometry(QtCore.QRect(390, 90, 140, 70))
+        self.group_box_segment_duration.setObjectName("group_box_segment_duration")
+        self.segment_duration = QtWidgets.QSpinBox(self.group_box_segment_duration)
+        self.segment_duration.setGeometry(QtCore.QRect(20, 30, 80, 22))
+        self.segment_duration.setRange(0, 86400)
+        self.segment_duration.setObjectName("segment_duration")
+
+        self.group_box_segment_size = QtWidgets.QGroupBox(self)
+        self.group_box_segment_size.setGeometry(QtCore.QRect(540, 90, 140, 70))
+        self.group_box_segment_size.setObjectName("group_box_segment_size")
+        self.segment_size = QtWidgets.QSpinBox(self.group_box_segment_size)
+        self.segment_size.setGeometry(QtCore.QRect(20, 30, 80, 22))
+        self.segment_size.setRange(0, 1048576)
+        self.segment_size.setObjectName("segment_size")
+
+
         #FILE NAME
         self.group_box_filename = QtWidgets.QGroupBox(self)
         self.group_box_filename.setGeometry(QtCore.QRect(10, 190, 661, 91))
@@ -60,6 +79,35 @@ class ScreenRecorder(QtWidgets.QWidget):
         self.filename.setGeometry(QtCore.QRect(20, 40, 601, 22))
         self.filename.setObjectName("filename")
 
+        #VARIABLE FRAME RATE
+        self.variable_frame_rate = QtWidgets.QCheckBox("Write only the frames that change (variable frame rate)", self)
+        self.variable_frame_rate.setGeometry(QtCore.QRect(10, 290, 400, 30))
+        self.variable_frame_rate.setObjectName("variable_frame_rate")
+
+        #REGION
+        self.group_box_region = QtWidgets.QGroupBox(self)
+        self.group_box_region.setGeometry(QtCore.QRect(10, 330, 661, 91))
+        self.group_box_region.setObjectName("group_box_region")
+        self.region = QtWidgets.QComboBox(self.group_box_region)
+        self.region.setGeometry(QtCore.QRect(20, 40, 120, 22))
+        self.region.setObjectName("region")
+        for region, name in REGIONS.items():
+            self.region.addItem(name, region)
+        self.region.currentIndexChanged.connect(self._is_enabled_region)
+        self.monitor = QtWidgets.QSpinBox(self.group_box_region)
+        self.monitor.setGeometry(QtCore.QRect(160, 40, 60, 22))
+        self.monitor.setRange(0, 15)
+        self.monitor.setObjectName("monitor")
+        self.rectangle = QtWidgets.QLineEdit(self.group_box_region)
+        self.rectangle.setGeometry(QtCore.QRect(240, 40, 200, 22))
+        self.rectangle.setPlaceholderText("x,y,width,height")
+        self.rectangle.setObjectName("rectangle")
+        self.scale = QtWidgets.QSpinBox(self.group_box_region)
+        self.scale.setGeometry(QtCore.QRect(540, 40, 60, 22))
+        self.scale.setRange(1, 8)
+        self.scale.setPrefix("1/")
+        self.scale.setObjectName("scale")
+
 
 
    def retranslateUi(self):
@@ -67,18 +115,37 @@ class ScreenRecorder(QtWidgets.QWidget):
         self.setWindowTitle(_translate("Codec", "Screen Recorder Options"))
         self.group_box_fps.setTitle(_translate("ConfigurationView", "Frame per Second (fps)"))
         self.group_box_filename.setTitle(_translate("ConfigurationView", "File Name"))
+        self.group_box_segment_duration.setTitle(_translate("ConfigurationView", "Segment (s)"))
+        self.group_box_segment_size.setTitle(_translate("ConfigurationView", "Segment (MiB)"))
+        self.group_box_region.setTitle(_translate("ConfigurationView", "Region (monitor, rectangle) and scale"))
+
+   def _is_enabled_region(self):
+        self.monitor.setEnabled(self.region.currentData() == REGION_MONITOR)
+        self.rectangle.setEnabled(self.region.currentData() == REGION_RECTANGLE)
 
 
    def _is_enabled_screen_recorder(self):
         self.group_box_fps.setEnabled(self.enabled_checkbox.isChecked())
         self.group_box_codec.setEnabled(self.enabled_checkbox.isChecked())
         self.group_box_filename.setEnabled(self.enabled_checkbox.isChecked())
+        self.variable_frame_rate.setEnabled(self.enabled_checkbox.isChecked())
+        self.group_box_segment_duration.setEnabled(self.enabled_checkbox.isChecked())
+        self.group_box_segment_size.setEnabled(self.enabled_checkbox.isChecked())
+        self.group_box_region.setEnabled(self.enabled_checkbox.isChecked())
 
    def __set_current_config_values(self):
         self.enabled_checkbox.setChecked(self.options['enabled'])
         self.fps.setValue(self.options['fps'])
         self.group_box_codec.set_index_from_codec_id(self.options['codec_id'])
         self.filename.setText(self.options['filename'])
+        self.variable_frame_rate.setChecked(bool(self.options['variable_frame_rate']))
+        self.segment_duration.setValue(self.options['segment_duration'] or 0)
+        self.segment_size.setValue(self.options['segment_size'] or 0)
+        self.region.setCurrentIndex(self.region.findData(self.options['region'] or REGION_MONITOR))
+        self.monitor.setValue(self.options['monitor'] or 0)
+        self.rectangle.setText(self.options['rectangle'] or '')
+        self.scale.setValue(self.options['scale'] or 1)
+        self._is_enabled_region()
 
         self._is_enabled_screen_recorder()
 
@@ -89,9 +156,9 @@ class ScreenRecorder(QtWidgets.QWidget):
             if item is not None:
                 if isinstance(item, QtWidgets.QComboBox) is not False and item.currentData():
                     item = item.currentData()
-                elif isinstance(item, QtWidgets.QLineEdit) is not False and item.text():
+                elif isinstance(item, QtWidgets.QLineEdit):
                     item = item.text()
-                elif isinstance(item, QtWidgets.QSpinBox) is not False and item.value():
+                elif isinstance(item, QtWidgets.QSpinBox):
                     item = item.value()
                 elif isinstance(item, QtWidgets.QCheckBox):
                     item = item.isChecked()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+from PyQt6 import QtCore, QtWidgets
+from controller.configurations.tabs.screenshot.screenshot import Screenshot as ScreenshotController
+from common.constants.view.web import CAPTURE_MODES, CAPTURE_MODE_OFFSCREEN, PDF_LAYOUTS
+
+__is_tab__ = True
+
+
+class Screenshot(QtWidgets.QWidget):
+
+    def __init__(self, parent=None):
+
+        super(Screenshot, self).__init__(parent)
+
+        self.controller = ScreenshotController()
+        self.options = self.controller.options
+
+        self.setObjectName("configuration_screenshot")
+
+        self.initUI()
+        self.retranslateUi()
+        self.__set_current_config_values()
+
+    def initUI(self):
+        # WAIT TIMEOUT GROUPBOX
+        self.group_box_wait_timeout = QtWidgets.QGroupBox(self)
+        self.group_box_wait_timeout.setGeometry(QtCore.QRect(10, 30, 300, 70))
+        self.group_box_wait_timeout.setObjectName("group_box_wait_timeout")
+        self.wait_timeout = QtWidgets.QSpinBox(self.group_box_wait_timeout)
+        self.wait_timeout.setGeometry(QtCore.QRect(20, 30, 100, 22))
+        self.wait_timeout.setRange(100, 60000)
+        self.wait_timeout.setSingleStep(100)
+        self.wait_timeout.setObjectName("wait_timeout")
+
+        # CAPTURE MODE GROUPBOX
+        self.group_box_capture_mode = QtWidgets.QGroupBox(self)
+        self.group_box_capture_mode.setGeometry(QtCore.QRect(10, 110, 300, 70))
+        self.group_box_capture_mode.setObjectName("group_box_capture_mode")
+        self.capture_mode = QtWidgets.QComboBox(self.group_box_capture_mode)
+        self.capture_mode.setGeometry(QtCore.QRect(20, 30, 250, 22))
+        self.capture_mode.setObjectName("capture_mode")
+        for mode, name in CAPTURE_MODES.items():
+            self.capture_mode.addItem(name, mode)
+        self.capture_mode.currentIndexChanged.connect(self._is_offscreen_capture_mode)
+
+        # TILE HEIGHT GROUPBOX
+        self.group_box_tile_height = QtWidgets.QGroupBox(self)
+        self.group_box_tile_height.setGeometry(QtCore.QRect(330, 110, 300, 70))
+        self.group_box_tile_height.setObjectName("group_box_tile_height")
+        self.tile_height = QtWidgets.QSpinBox(self.group_box_tile_height)
+        self.tile_height.setGeometry(QtCore.QRect(20, 30, 100, 22))
+        self.tile_height.setRange(500, 16384)
+        self.tile_height.setSingleStep(256)
+        self.tile_height.setObjectName("tile_height")
+
+        # PRINT PDF CHECKBOX
+        self.print_pdf = QtWidgets.QCheckBox("Save a vector copy of the page (PDF)", self)
+        self.print_pdf.setGeometry(QtCore.QRect(10, 190, 300, 30))
+        self.print_pdf.stateChanged.connect(self._is_enabled_print_pdf)
+        self.print_pdf.setObjectName("print_pdf")
+
+        # PDF LAYOUT GROUPBOX
+        self.group_box_pdf_layout = QtWidgets.QGroupBox(self)
+        self.group_box_pdf_layout.setGeometry(QtCore.QRect(10, 230, 300, 70))
+        self.group_box_pdf_layout.setObjectName("group_box_pdf_layout")
+        self.pdf_layout = QtWidgets.QComboBox(self.group_box_pdf_layout)
+        self.pdf_layout.setGeometry(QtCore.QRect(20, 30, 250, 22))
+        self.pdf_layout.setObjectName("pdf_layout")
+        for layout, name in PDF_LAYOUTS.items():
+            self.pdf_layout.addItem(name, layout)
+
+    def retranslateUi(self):
+        _translate = QtCore.QCoreApplication.translate
+        self.setWindowTitle(_translate("Screenshot", "Screenshot Options"))
+        self.group_box_wait_timeout.setTitle(_translate("Screenshot", "Max wait after scroll (ms)"))
+        self.group_box_capture_mode.setTitle(_translate("Screenshot", "Full page capture mode"))
+        self.group_box_tile_height.setTitle(_translate("Screenshot", "Offscreen tile height (px)"))
+        self.group_box_pdf_layout.setTitle(_translate("Screenshot", "PDF layout"))
+
+    def _is_offscreen_capture_mode(self):
+        self.group_box_tile_height.setEnabled(self.capture_mode.currentData() == CAPTURE_MODE_OFFSCREEN)
+
+    def _is_enabled_print_pdf(self):
+        self.group_box_pdf_layout.setEnabled(self.print_pdf.isChecked())
+
+    def __set_current_config_values(self):
+        self.wait_timeout.setValue(self.options['wait_timeout'])
+        self.capture_mode.setCurrentIndex(self.capture_mode.findData(self.options['capture_mode']))
+        self.tile_height.setValue(self.options['tile_height'])
+        self._is_offscreen_capture_mode()
+        self.print_pdf.setChecked(self.options['print_pdf'])
+        self.pdf_layout.setCurrentIndex(self.pdf_layout.findData(self.options['pdf_layout']))
+        self._is_enabled_print_pdf()
+
+    def __get_current_values(self):
+        for keyword in self.options:
+            item = self.findChild(QtCore.QObject, keyword)
+
+            if item is not None:
+                if isinstance(item, QtWidgets.QComboBox):
+                    item = item.currentData()
+                elif isinstance(item, QtWidgets.QSpinBox):
+                    item = item.value()
+                elif isinstance(item, QtWidgets.QCheckBox):
+                    item = item.isChecked()
+
+                self.options[keyword] = item
+
+    def accept(self) -> None:
+        self.__get_current_values()
+        self.controller.options = self.options
+
+    def reject(self) -> None:
+        pass
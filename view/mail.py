@@ -33,6 +33,7 @@ from common.constants.view.pec import search_pec
 from common.constants import tasks, error, details as Details, logger as Logger
 
 logger = logging.getLogger(__name__)
+hash_logger = logging.getLogger('hashreport')
 
 
 class MailWorker(QObject):
@@ -92,7 +93,10 @@ class MailWorker(QObject):
                 email_id = emails.partition('UID: ')[2]
                 # Create acquisition folder
                 folder_stripped = re.sub(r"[^a-zA-Z0-9]+", '-', folder)
-                self.mail_controller.write_emails(email_id, self.acquisition_mail_dir, folder_stripped, folder)
+                file_hash = self.mail_controller.write_emails(email_id, self.acquisition_mail_dir, folder_stripped, folder)
+                # digests are computed while the eml is written, before it ends up in the zip
+                file_hash.name = os.path.relpath(file_hash.filename, self.acquisition_mail_dir)
+                file_hash.log(hash_logger)
                 self.progress.emit()
 
 
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+import os
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from common.merkle import get_merkle_leaf_size
+from common.pcap import FLOW_INDEX_SUFFIX
+from common.tls import (decrypt_capture, get_decrypt_workers, HTTP_INDEX_FILENAME, HTTP_STORE_DIRECTORY,
+                        KEY_LOG_FILENAME)
+
+
+class Decrypt(QObject):
+    finished = pyqtSignal()  # give worker class a finished signal
+    progress = pyqtSignal(int)  # percentage of the TLS flows decrypted
+
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent=parent)
+        self.folder = None
+        self.workers = get_decrypt_workers()
+        self.leaf_size = get_merkle_leaf_size()
+        self.result = None
+        self.error = None
+        self.__percentage = -1
+
+    def set_options(self, options):
+        self.folder = options['folder']
+        self.workers = options.get('workers') or self.workers
+
+    def decrypt(self):
+        try:
+            self.result = decrypt_capture(self.folder,
+                                          os.path.join(self.folder, 'acquisition' + FLOW_INDEX_SUFFIX),
+                                          os.path.join(self.folder, KEY_LOG_FILENAME),
+                                          os.path.join(self.folder, HTTP_INDEX_FILENAME),
+                                          os.path.join(self.folder, HTTP_STORE_DIRECTORY),
+                                          workers=self.workers, progress=self.__progress, leaf_size=self.leaf_size)
+        except Exception as e:
+            self.error = str(e)
+
+        self.finished.emit()
+
+    def __progress(self, decrypted, total):
+        percentage = int(decrypted * 100 / total) if total else 100
+        if percentage != self.__percentage:
+            self.__percentage = percentage
+            self.progress.emit(percentage)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+import os
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from common.hashing import (calculate_hashes_parallel, calculate_zip_member_hashes, get_hash_workers,
+                            get_registered_hash, is_hash_cache_enabled, walk_files, write_hash_manifest,
+                            HASH_MANIFEST_FILENAME)
+from common.merkle import MANIFEST_FILENAME, get_merkle_leaf_size, write_manifest
+
+from controller.hash_cache import HashCache as HashCacheController
+
+
+class Hash(QObject):
+    finished = pyqtSignal()  # give worker class a finished signal
+    progress = pyqtSignal(str, int)  # filename, percentage of all bytes hashed
+    hashed = pyqtSignal(object)  # FileHash of every completed file
+
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent=parent)
+        self.folder = None
+        self.exclude = []
+        self.workers = get_hash_workers()
+        self.leaf_size = get_merkle_leaf_size()
+        self.force = False
+        self.hashes = []
+        self.archives = {}
+        self.error = None
+        self.__lock = threading.Lock()
+        self.__total_bytes = 0
+        self.__hashed_bytes = 0
+        self.__percentage = -1
+
+    def set_options(self, options):
+        self.folder = options['folder']
+        self.exclude = options.get('exclude', [])
+        self.workers = options.get('workers') or self.workers
+        self.force = options.get('force', False)
+
+    def calculate(self):
+        try:
+            names = dict(walk_files(self.folder, self.exclude))
+            files = list(names.keys())
+
+            # files hashed while they were written are not read again
+            self.__total_bytes = sum(os.path.getsize(file) for file in files
+                                     if self.force or get_registered_hash(file, leaf_size=self.leaf_size) is None)
+            self.__hashed_bytes = 0
+            self.__percentage = -1
+
+            # the cache model owns a database session, create it on the worker thread
+            cache = HashCacheController() if is_hash_cache_enabled() else None
+            self.hashes = calculate_hashes_parallel(files, workers=self.workers, progress=self.__progress,
+                                                    hashed=self.hashed.emit, leaf_size=self.leaf_size,
+                                                    cache=cache, force=self.force)
+            for file_hash in self.hashes:
+                file_hash.name = names[file_hash.filename]
+
+            self.archives = {}
+            for file_hash in self.hashes:
+                if file_hash.name.endswith('.zip'):
+                    members = calculate_zip_member_hashes(file_hash.filename, workers=self.workers)
+                    for member in members:
+                        self.hashed.emit(member)
+                    self.archives[file_hash.name] = members
+
+            manifests = [os.path.join(self.folder, HASH_MANIFEST_FILENAME)]
+            write_hash_manifest(manifests[0], self.hashes, self.archives)
+            if self.leaf_size:
+                manifests.append(os.path.join(self.folder, MANIFEST_FILENAME))
+                write_manifest(manifests[1], self.hashes, self.leaf_size)
+
+            # the manifests are logged with the files they describe, the hash log protects them
+            for file_hash in calculate_hashes_parallel(manifests, workers=self.workers):
+                file_hash.name = os.path.basename(file_hash.filename)
+                self.hashes.append(file_hash)
+        except Exception as e:
+            self.error = str(e)
+
+        self.finished.emit()
+
+    def __progress(self, filename, size):
+        # called from the pool threads, emit only when the percentage changes
+        with self.__lock:
+            self.__hashed_bytes += size
+            percentage = int(self.__hashed_bytes * 100 / self.__total_bytes) if self.__total_bytes else 100
+            if percentage == self.__percentage:
+                return
+            self.__percentage = percentage
+
+        self.progress.emit(os.path.basename(filename), percentage)
@@ -12,13 +12,18 @@ import logging
 from PyQt6 import QtCore, QtWidgets
 
 from common.constants import logger as Logger, details, state, status as Status, tasks, error
-from common.utility import calculate_hash
+from common.merkle import MANIFEST_FILENAME
+from common.hashing import HASH_MANIFEST_FILENAME
+from common.pcap import FLOW_INDEX_SUFFIX
+from common.tls import KEY_LOG_FILENAME
 
 from controller.report import Report as ReportController
 from controller.configurations.tabs.timestamp.timestamp import Timestamp as TimestampController
 from controller.configurations.tabs.pec.pec import Pec as PecController
 
 from view.post_acquisition.timestamp import Timestamp as TimestampView
+from view.post_acquisition.hash import Hash as HashView
+from view.post_acquisition.decrypt import Decrypt as DecryptView
 from view.post_acquisition.pec.pec import Pec as PecView
 
 logger = logging.getLogger('hashreport')
@@ -30,38 +35,89 @@ class PostAcquisition(QtCore.QObject):
         super().__init__(parent)
         self.is_finished_timestamp = False
         self.is_finished_pec = False
+        self.hashes = []
+        self.archives = {}
 
     def execute(self, folder, case_info, type):
-       self.calculate_acquisition_file_hash(folder)
-       self.generate_pdf_report(folder, case_info, type)
-       self.generate_timestamp_report(folder, case_info, type)
+       self.decrypt_tls_sessions(folder, case_info, type)
+
+    def decrypt_tls_sessions(self, folder, case_info, type):
+        # the decrypted contents are saved before the hashes of the acquisition files are calculated
+        if not os.path.isfile(os.path.join(folder, KEY_LOG_FILENAME)) or \
+                not os.path.isfile(os.path.join(folder, 'acquisition' + FLOW_INDEX_SUFFIX)):
+            self.parent().upadate_progress_bar()
+            self.calculate_acquisition_file_hash(folder, case_info, type)
+            return
+
+        self.parent().set_message_on_the_statusbar(tasks.TLS_DECRYPT)
+
+        self.thread_decrypt = QtCore.QThread()
+        self.tls_decrypt = DecryptView()
+        self.tls_decrypt.set_options({'folder': folder})
+        self.tls_decrypt.moveToThread(self.thread_decrypt)
+        self.thread_decrypt.started.connect(self.tls_decrypt.decrypt)
+
+        self.tls_decrypt.progress.connect(self.__decrypt_progress)
+        self.tls_decrypt.finished.connect(self.thread_decrypt.quit)
+
+        self.thread_decrypt.finished.connect(lambda: self.__thread_decrypt_is_finished(folder, case_info, type))
+
+        self.thread_decrypt.start()
+
+    def __decrypt_progress(self, percentage):
+        self.parent().set_message_on_the_statusbar(tasks.TLS_DECRYPT_PROGRESS.format(percentage))
+
+    def __thread_decrypt_is_finished(self, folder, case_info, type):
+        if self.tls_decrypt.error is not None:
+            self.parent().set_message_on_the_statusbar(tasks.TLS_DECRYPT_FAILED.format(self.tls_decrypt.error))
+            self.parent().logger.error(Logger.TLS_DECRYPT_FAILED.format(self.tls_decrypt.error))
+        self.tls_decrypt.deleteLater()
+        self.parent().upadate_progress_bar()
+
+        self.calculate_acquisition_file_hash(folder, case_info, type)
 
         
-    def calculate_acquisition_file_hash(self, folder):
+    def calculate_acquisition_file_hash(self, folder, case_info, type):
 
         self.parent().set_message_on_the_statusbar(tasks.HASHFILE)
 
-        files = [f.name for f in os.scandir(folder) if f.is_file()]
-        for file in files:
-            if file != 'acquisition.hash':
-                filename = os.path.join(folder, file)
-                file_stats = os.stat(filename)
-                logger.info(file)
-                logger.info('=========================================================')
-                logger.info(f'Size: {file_stats.st_size}')
-                algorithm = 'md5'
-                logger.info(f'MD5: {calculate_hash(filename, algorithm)}\n')
-                algorithm = 'sha1'
-                logger.info(f'SHA-1: {calculate_hash(filename, algorithm)}\n')
-                algorithm = 'sha256'
-                logger.info(f'SHA-256: {calculate_hash(filename, algorithm)}\n')
+        self.hashes = []
+        self.archives = {}
+        self.thread_hash = QtCore.QThread()
+        self.hash = HashView()
+        self.hash.set_options({'folder': folder,
+                               'exclude': ['acquisition.hash', MANIFEST_FILENAME, HASH_MANIFEST_FILENAME]})
+        self.hash.moveToThread(self.thread_hash)
+        self.thread_hash.started.connect(self.hash.calculate)
+
+        self.hash.progress.connect(self.__hash_progress)
+        self.hash.finished.connect(self.thread_hash.quit)
+
+        self.thread_hash.finished.connect(lambda: self.__thread_hash_is_finished(folder, case_info, type))
+
+        self.thread_hash.start()
 
+    def __hash_progress(self, filename, percentage):
+        self.parent().set_message_on_the_statusbar(tasks.HASHFILE_PROGRESS.format(filename, percentage))
+
+    def __thread_hash_is_finished(self, folder, case_info, type):
+        if self.hash.error is not None:
+            self.parent().set_message_on_the_statusbar(tasks.HASHFILE_FAILED.format(self.hash.error))
+            self.parent().logger.error(Logger.CALCULATE_HASHFILE_FAILED.format(self.hash.error))
+        self.hashes = self.hash.hashes
+        self.archives = self.hash.archives
+        for file_hash in self.hashes:
+            file_hash.log(logger)
+
+        self.hash.deleteLater()
         self.parent().upadate_progress_bar()
 
-        
+        self.generate_pdf_report(folder, case_info, type)
+        self.generate_timestamp_report(folder, case_info, type)
+
     def generate_pdf_report(self, folder, case_info,type):
         self.parent().set_message_on_the_statusbar(tasks.REPORTFILE)
-        report = ReportController(folder, case_info)
+        report = ReportController(folder, case_info, self.hashes, self.archives)
         report.generate_pdf(type, self.parent().get_time())
         self.parent().upadate_progress_bar()
 
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+######
+# -----
+# Copyright (c) 2023 FIT-Project
+# SPDX-License-Identifier: GPL-3.0-only
+# -----
+######
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from configparser import SafeConfigParser
+
+from PyQt6 import QtCore, QtGui
+
+from common.hashing import HashingWriter
+from common.merkle import get_merkle_leaf_size
+
+logger = logging.getLogger(__name__)
+
+# interval (s) the GUI thread keeps processing events while it waits for the encoders
+WAIT_INTERVAL = 0.05
+
+
+def get_encoder_options():
+    parser = SafeConfigParser()
+    parser.read('assets/config.ini')
+
+    return (parser.getint('fit_properties', 'screenshot_encoder_workers', fallback=2),
+            parser.getint('fit_properties', 'screenshot_encoder_max_pending', fallback=8))
+
+
+class ScreenshotEncoder():
+    # grabbed images are encoded, written and hashed out of the GUI thread
+    def __init__(self, workers=None, max_pending=None):
+        default_workers, default_max_pending = get_encoder_options()
+        self.workers = max(1, workers or default_workers)
+        self.max_pending = max(1, max_pending or default_max_pending)
+        self.leaf_size = get_merkle_leaf_size()
+        self.__executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='screenshot-encoder')
+        self.__slots = threading.BoundedSemaphore(self.max_pending)
+        self.__lock = threading.Lock()
+        self.__pending = []
+
+    def submit(self, image, filename):
+        # back-pressure: at most max_pending images (and their memory) are queued
+        while not self.__slots.acquire(timeout=WAIT_INTERVAL):
+            QtCore.QCoreApplication.processEvents()
+
+        future = self.__executor.submit(self.__encode, image, filename)
+        future.add_done_callback(lambda future: self.__slots.release())
+        with self.__lock:
+            self.__pending.append(future)
+
+        return future
+
+    def wait(self):
+        with self.__lock:
+            pending, self.__pending = self.__pending, []
+
+        while wait(pending, timeout=WAIT_INTERVAL).not_done:
+            QtCore.QCoreApplication.processEvents()
+
+        hashes = []
+        for future in pending:
+            try:
+                hashes.append(future.result())
+            except Exception as e:
+                logger.error('unable to save screenshot: %s', e)
+
+        return hashes
+
+    def shutdown(self):
+        hashes = self.wait()
+        self.__executor.shutdown()
+
+        return hashes
+
+    def __encode(self, image, filename):
+        with HashingWriter(filename, leaf_size=self.leaf_size) as f:
+            if isinstance(image, QtGui.QImage):
+                data = QtCore.QByteArray()
+                buffer = QtCore.QBuffer(data)
+                buffer.open(QtCore.QIODevice.OpenModeFlag.WriteOnly)
+                if not image.save(buffer, 'PNG'):
+                    raise OSError('PNG encoding failed for ' + filename)
+                buffer.close()
+                f.write(data.data())
+            else:
+                # PIL images (e.g. the selected area)
+                image.save(f, 'PNG')
+
+        return f.file_hash
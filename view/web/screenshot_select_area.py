@@ -95,9 +95,10 @@ class SnippingWidget(QtWidgets.QWidget):
 class SelectArea(QtCore.QObject):
     finished = QtCore.pyqtSignal()  # give worker class a finished signal
 
-    def __init__(self, filename, parent=None):
+    def __init__(self, filename, parent=None, encoder=None):
         QtCore.QObject.__init__(self, parent=parent)
         self.filename = filename
+        self.encoder = encoder
         self.snippingWidget = SnippingWidget(app=QtWidgets.QApplication.instance())
         self.snippingWidget.onSnippingCompleted = self.__on_snipping_completed
 
@@ -106,7 +107,10 @@ class SelectArea(QtCore.QObject):
             self.__finished()
             return
         time.sleep(1)
-        frame.save(self.filename)
+        if self.encoder is not None:
+            self.encoder.submit(frame, self.filename)
+        else:
+            frame.save(self.filename)
         self.__finished()
 
     def snip_area(self):
@@ -8,21 +8,21 @@
 ######
 
 import logging
+import math
 import os.path
 import shutil
 from urllib.parse import urlparse
 
-import numpy as np
-from PIL import Image
-
 from PyQt6 import QtCore, QtGui, QtWidgets
-from PyQt6.QtWebEngineCore import QWebEnginePage, QWebEngineProfile
+from PyQt6.QtWebEngineCore import (QWebEnginePage, QWebEngineProfile, QWebEngineScript,
+                                   QWebEngineUrlRequestInterceptor)
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtWebEngineCore import QWebEngineDownloadRequest
 from PyQt6.QtWidgets import QFileDialog
 
 from view.web.navigationtoolbar import NavigationToolBar as NavigationToolBarView
 from view.web.screenshot_select_area import SelectArea as SelectAreaView
+from view.web.screenshot_encoder import ScreenshotEncoder
 from view.acquisition.acquisition import Acquisition
 from view.acquisition.tasks.task import AcquisitionTask
 
@@ -30,12 +30,17 @@ from view.case import Case as CaseView
 from view.configuration import Configuration as ConfigurationView
 from view.error import Error as ErrorView
 
+from controller.configurations.tabs.screenshot.screenshot import Screenshot as ScreenshotController
+from controller.configurations.tabs.packetcapture.packetcapture import PacketCapture as PacketCaptureController
+
 from common.constants import tasks as Tasks, logger as Logger, state, status as Status, error, details as Details
-from common.constants.view import general
+from common.constants.view import general, web
 
 from common.settings import DEBUG
 from common.config import LogConfigTools
 from common.utility import screenshot_filename
+from common.screenshot import stitch_images, qimage_to_array, find_fixed_regions, find_shift
+from common.merkle import get_merkle_leaf_size
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +59,21 @@ class WebEnginePage(QWebEnginePage):
         return page
 
 
+class RequestInterceptor(QWebEngineUrlRequestInterceptor):
+    host_requested = QtCore.pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hosts = set()
+
+    # every host the browser requests during the acquisition, to scope the packet capture
+    def interceptRequest(self, info):
+        host = info.requestUrl().host()
+        if host and host not in self.hosts:
+            self.hosts.add(host)
+            self.host_requested.emit(host)
+
+
 class Browser(QWebEngineView):
     saveResourcesFinished = QtCore.pyqtSignal()
     downloadItemFinished = QtCore.pyqtSignal(str)
@@ -115,6 +135,7 @@ class Web(QtWidgets.QMainWindow):
         self.acquisition_directory = None
         self.acquisition_page_folder = None
         self.screenshot_directory = None
+        self.screenshot_encoder = None
         self.current_page_load_is_finished = False
         self.log_confing = LogConfigTools()
         self.log_confing.set_web_loggers()
@@ -233,6 +254,7 @@ class Web(QtWidgets.QMainWindow):
             self.screenshot_directory = os.path.join(self.acquisition_directory, "screenshot")
             if not os.path.isdir(self.screenshot_directory):
                 os.makedirs(self.screenshot_directory)
+            self.screenshot_encoder = ScreenshotEncoder()
 
             # show progress bar
             self.progress_bar.setHidden(False)
@@ -252,6 +274,12 @@ class Web(QtWidgets.QMainWindow):
             tasks = [Tasks.SCREEN_RECORDER, Tasks.PACKET_CAPTURE]
             self.acquisition.start(tasks, self.acquisition_directory, self.case_info)
 
+            if PacketCaptureController().options['auto_filter']:
+                self.request_interceptor = RequestInterceptor(self)
+                self.request_interceptor.host_requested.connect(self.acquisition.add_capture_host)
+                profile.setUrlRequestInterceptor(self.request_interceptor)
+                self.acquisition.add_capture_host(self.tabs.currentWidget().url().host())
+
     def stop_acquisition(self):
 
         if self.start_acquisition_is_finished:
@@ -259,6 +287,7 @@ class Web(QtWidgets.QMainWindow):
             self.progress_bar.setHidden(False)
             url = self.tabs.currentWidget().url().toString()
             self.__disable_all()
+            QWebEngineProfile.defaultProfile().setUrlRequestInterceptor(None)
             # external tasks
             tasks = [
                 Tasks.PACKET_CAPTURE,
@@ -276,6 +305,9 @@ class Web(QtWidgets.QMainWindow):
             self.__tasks.append(screenshot)
             save_page = AcquisitionTask(Tasks.SAVE_PAGE, state.STARTED, Status.PENDING)
             self.__tasks.append(save_page)
+            if ScreenshotController().options['print_pdf']:
+                print_pdf = AcquisitionTask(Tasks.PRINT_PDF, state.STARTED, Status.PENDING)
+                self.__tasks.append(print_pdf)
 
             self.acquisition.stop(tasks, url, len(self.__tasks))
 
@@ -289,6 +321,8 @@ class Web(QtWidgets.QMainWindow):
         else:
             # start internal tasks
             self.take_full_page_screenshot(last=True)
+            if any(task.name == Tasks.PRINT_PDF for task in self.__tasks):
+                self.print_page_to_pdf()
             self.save_page()
 
     def __are_internal_tasks_completed(self):
@@ -413,6 +447,49 @@ class Web(QtWidgets.QMainWindow):
         task.status = Status.COMPLETED
         self.__are_internal_tasks_completed()
 
+    def print_page_to_pdf(self):
+        self.acquisition.logger.info(Logger.PRINT_PDF)
+        self.acquisition.info.add_task(Tasks.PRINT_PDF, state.STARTED, Status.PENDING)
+
+        self.status.showMessage(Logger.PRINT_PDF)
+
+        page = self.tabs.currentWidget().page()
+        page.pdfPrintingFinished.connect(self.__print_page_to_pdf_finished)
+        # the whole page is printed by the browser engine in a single call, as vectors and text
+        page.printToPdf(os.path.join(self.acquisition_directory, web.PDF_FILENAME),
+                        self.__pdf_page_layout(page, ScreenshotController().options['pdf_layout']))
+
+    def __pdf_page_layout(self, page, layout):
+        margins = QtCore.QMarginsF(0, 0, 0, 0)
+        if layout == web.PDF_LAYOUT_SINGLE_PAGE:
+            # CSS pixels are 3/4 of a point
+            size = page.contentsSize() * 0.75
+            page_size = QtGui.QPageSize(QtCore.QSizeF(min(size.width(), web.PDF_MAX_PAGE_SIZE),
+                                                      min(size.height(), web.PDF_MAX_PAGE_SIZE)),
+                                        QtGui.QPageSize.Unit.Point, 'FIT', QtGui.QPageSize.SizeMatchPolicy.ExactMatch)
+        else:
+            page_size = QtGui.QPageSize(QtGui.QPageSize.PageSizeId.A4)
+            margins = QtCore.QMarginsF(36, 36, 36, 36)
+
+        return QtGui.QPageLayout(page_size, QtGui.QPageLayout.Orientation.Portrait, margins)
+
+    def __print_page_to_pdf_finished(self, filename, success):
+        self.tabs.currentWidget().page().pdfPrintingFinished.disconnect(self.__print_page_to_pdf_finished)
+
+        row = self.acquisition.info.get_row(Tasks.PRINT_PDF)
+        if success:
+            self.acquisition.info.update_task(row, state.FINISHED, Status.COMPLETED, '')
+        else:
+            self.acquisition.logger.info(Logger.PRINT_PDF_FAILED)
+            self.acquisition.info.update_task(row, state.FINISHED, Status.FAIL, Logger.PRINT_PDF_FAILED)
+
+        task = list(filter(lambda task: task.name == Tasks.PRINT_PDF, self.__tasks))[0]
+        self.acquisition.upadate_progress_bar()
+        task.state = state.FINISHED
+        # the raster screenshot is still there, a failure doesn't stop the acquisition
+        task.status = Status.COMPLETED
+        self.__are_internal_tasks_completed()
+
     def case(self):
         self.case_view.exec()
 
@@ -423,7 +500,7 @@ class Web(QtWidgets.QMainWindow):
         if self.screenshot_directory is not None:
             self.__disable_all()
             filename = screenshot_filename(self.screenshot_directory, self.tabs.currentWidget().url().host())
-            self.tabs.currentWidget().grab().save(filename)
+            self.screenshot_encoder.submit(self.tabs.currentWidget().grab().toImage(), filename)
             self.__enable_all()
 
     def take_screenshot_selected_area(self):
@@ -431,7 +508,7 @@ class Web(QtWidgets.QMainWindow):
             self.__disable_all()
             filename = screenshot_filename(self.screenshot_directory,
                                            "selected_" + self.tabs.currentWidget().url().host())
-            select_area = SelectAreaView(filename, self)
+            select_area = SelectAreaView(filename, self, self.screenshot_encoder)
             select_area.finished.connect(self.__enable_all)
             select_area.snip_area()
 
@@ -452,13 +529,19 @@ class Web(QtWidgets.QMainWindow):
                 self.progress_bar.setHidden(False)
 
             self.__disable_all()
-            # move page on top
-            self.tabs.currentWidget().page().runJavaScript("window.scrollTo(0, 0);")
+
+            browser = self.tabs.currentWidget()
+            options = ScreenshotController().options
+            wait_timeout = options['wait_timeout']
+
+            view = browser
+            if options['capture_mode'] == web.CAPTURE_MODE_OFFSCREEN:
+                view = self.__offscreen_view(browser, options['tile_height'], wait_timeout)
 
             next = 0
             part = 0
-            step = self.tabs.currentWidget().height()
-            end = self.tabs.currentWidget().page().contentsSize().toSize().height()
+            step = view.height()
+            end = view.page().contentsSize().toSize().height()
             parts = end / step
 
             increment = 90 / parts
@@ -469,41 +552,70 @@ class Web(QtWidgets.QMainWindow):
                 progress = self.progress_bar.value()
 
             images = []
-
-            while next < end:
-                filename = screenshot_filename(full_page_folder, "part_" + str(part))
-                if next == 0:
-                    self.tabs.currentWidget().grab().save(filename)
-                else:
-                    self.tabs.currentWidget().page().runJavaScript("window.scrollTo({}, {});".format(0, next))
-                    ### Waiting everything is synchronized
-                    loop = QtCore.QEventLoop()
-                    QtCore.QTimer.singleShot(500, loop.quit)
-                    loop.exec()
-                    self.tabs.currentWidget().grab().save(filename)
-
-                progress += increment
-                self.progress_bar.setValue(progress)
-
-                images.append(filename)
-
-                part += 1
-                next += step
-
-            # combine all images part in an unique image
-            imgs = [Image.open(i) for i in images]
-            # pick the image which is the smallest, and resize the others to match it (can be arbitrary image shape here)
-            min_shape = sorted([(np.sum(i.size), i.size) for i in imgs])[0][1]
-
-            # for a vertical stacking it is simple: use vstack
-            imgs_comb = np.vstack([i.resize(min_shape) for i in imgs])
-            imgs_comb = Image.fromarray(imgs_comb)
+            crops = []
+            previous = None
+            previous_position = 0
+            header = footer = 0
+            scroll = step
+
+            try:
+                while next < end:
+                    filename = screenshot_filename(full_page_folder, "part_" + str(part))
+                    # the first part also moves the page on top
+                    if not self.__scroll_and_wait(view, next, wait_timeout):
+                        logger.warning('page not ready after %d ms, taking %s anyway', wait_timeout, filename)
+                    image = view.grab().toImage()
+                    current = qimage_to_array(image)
+                    scale = len(current) / step
+                    # the page can't be scrolled beyond its end, the last part overlaps the previous one
+                    position = min(next, max(end - step, 0))
+                    top = 0
+
+                    if previous is not None:
+                        if part == 1 and scroll == step:
+                            header, footer = find_fixed_regions(previous, current)
+                            if header + footer and \
+                                    (position - previous_position) * scale > len(current) - header - footer:
+                                # the content behind the fixed header and footer has been skipped,
+                                # from now on the page is scrolled less and this part is taken again
+                                scroll = max(1, step - math.ceil((header + footer) / scale))
+                                next = scroll
+                                continue
+
+                        shift = find_shift(previous, current, header, footer,
+                                           round((position - previous_position) * scale))
+                        top = max(header, len(current) - footer - shift)
+                        crops[-1][1] = footer
+
+                    self.screenshot_encoder.submit(image, filename)
+
+                    progress += increment
+                    self.progress_bar.setValue(progress)
+
+                    images.append(filename)
+                    crops.append([top, 0])
+                    previous = current
+                    previous_position = position
+
+                    part += 1
+                    next += scroll
+            finally:
+                # the page always goes back to the visible browser
+                if view is not browser:
+                    self.__restore_view(browser, view)
 
             whole_img_filename = screenshot_filename(full_page_folder, "full_page" + "")
             if last:
                 whole_img_filename = os.path.join(self.acquisition_directory, 'screenshot.png')
 
-            imgs_comb.save(whole_img_filename)
+            # the parts have to be on disk, as well as every screenshot before the acquisition ends
+            if last:
+                self.screenshot_encoder.shutdown()
+            else:
+                self.screenshot_encoder.wait()
+
+            # combine all images part in an unique image, streaming one part at a time
+            stitch_images(images, whole_img_filename, get_merkle_leaf_size(), crops)
 
             if last:
                 row = self.acquisition.info.get_row(Tasks.SCREENSHOT)
@@ -518,6 +630,62 @@ class Web(QtWidgets.QMainWindow):
                 self.__enable_all()
                 self.progress_bar.setHidden(True)
 
+    def __offscreen_view(self, browser, tile_height, timeout):
+        # the page is moved in a hidden view as high as the whole page, or as a tile
+        # if the page is higher, so that it is rendered (and grabbed) in one pass
+        page = browser.page()
+        height = page.contentsSize().toSize().height()
+        view = QWebEngineView()
+        view.setAttribute(QtCore.Qt.WidgetAttribute.WA_DontShowOnScreen)
+        view.resize(browser.width(), max(1, min(height, tile_height)))
+        view.setPage(page)
+        view.show()
+        # wait for the new layout, the contents size can change with the viewport
+        self.__scroll_and_wait(view, 0, timeout)
+
+        return view
+
+    def __restore_view(self, browser, view):
+        browser.setPage(view.page())
+        view.close()
+        view.deleteLater()
+
+    def __scroll_and_wait(self, browser, y, timeout):
+        # instead of sleeping, poll the page until it has rendered the new position
+        page = browser.page()
+        loop = QtCore.QEventLoop()
+        elapsed = QtCore.QElapsedTimer()
+        result = {'done': False, 'ready': False}
+
+        def finish(ready=False):
+            if not result['done']:
+                result['done'] = True
+                result['ready'] = ready
+                loop.quit()
+
+        def poll():
+            if not result['done']:
+                page.runJavaScript(web.READY_SCRIPT, QWebEngineScript.ScriptWorldId.ApplicationWorld.value, check)
+
+        def check(ready):
+            if result['done']:
+                return
+            if ready:
+                finish(True)
+            elif elapsed.hasExpired(timeout):
+                finish()
+            else:
+                QtCore.QTimer.singleShot(web.READY_POLL_INTERVAL, poll)
+
+        elapsed.start()
+        QtCore.QTimer.singleShot(timeout, finish)
+        # the state of the polling lives in an isolated world, the acquired page never sees it
+        page.runJavaScript(web.SCROLL_SCRIPT.format(y=y), QWebEngineScript.ScriptWorldId.ApplicationWorld.value,
+                           lambda _: poll())
+        loop.exec()
+
+        return result['ready']
+
     def back(self):
         self.tabs.currentWidget().back()
 